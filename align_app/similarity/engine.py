@@ -7,6 +7,7 @@ import cv2  # type: ignore
 import numpy as np
 
 from align_app.ui.canvas_affine import affine_params_to_small
+from align_app.ui.canvas_params import ImgParams
 from align_app.ui.canvas_perspective import (
     ensure_perspective_quad,
     perspective_with_affine_compose_preview,
@@ -24,7 +25,7 @@ Quad = List[Point]
 def compose_aligned_preview(
     base_prev: np.ndarray,
     mov_prev: np.ndarray,
-    params: Dict[str, object],
+    params: ImgParams,
     pw: int,
     ph: int,
 ) -> np.ndarray:
@@ -34,17 +35,13 @@ def compose_aligned_preview(
     """
     m_small = affine_params_to_small(mov_prev, params)
 
-    use_persp = (
-        "persp" in params
-        and isinstance(params["persp"], list)
-        and len(params["persp"]) == 4
-    )
+    use_persp = params.persp is not None and len(params.persp) == 4
     if use_persp:
         ensure_perspective_quad(params, pw, ph)
         out = perspective_with_affine_compose_preview(
             base_prev=base_prev,
             mov_prev=mov_prev,
-            dest_quad=params["persp"],  # type: ignore[index]
+            dest_quad=params.persp,  # type: ignore[arg-type]
             m_small=m_small,
             overlay=False,
             alpha=0.5,
@@ -234,7 +231,7 @@ def compute_similarity_metrics(
 def compute_similarity_for_params(
     base_prev: np.ndarray,
     mov_prev: np.ndarray,
-    params: Dict[str, object],
+    params: ImgParams,
     pw: int,
     ph: int,
 ) -> Dict[str, float]:
@@ -7,6 +7,7 @@ from PyQt5 import QtCore, QtGui, QtWidgets  # type: ignore
 
 from align_app.utils.img_io import bgr_to_qimage
 from align_app.similarity.engine import compute_similarity_for_params
+from align_app.ui.canvas_params import ImgParams
 
 # pylint: disable=protected-access
 
@@ -83,13 +84,13 @@ class SimilarityManager(QtCore.QObject):
     def _params_signature(self, path: Optional[Path]) -> Optional[ParamsSig]:
         if not path or not self.canvas.have_files():
             return None
-        p = self.canvas.params.get(path, {})
-        tx = float(p.get("tx", 0.0))
-        ty = float(p.get("ty", 0.0))
-        th = float(p.get("theta", 0.0))
-        sc = float(p.get("scale", 1.0))
-        quad = p.get("persp")
-        if isinstance(quad, list) and len(quad) == 4:
+        p = self.canvas.params.get(path) or ImgParams()
+        tx = float(p.tx)
+        ty = float(p.ty)
+        th = float(p.theta)
+        sc = float(p.scale)
+        quad = p.persp
+        if quad is not None and len(quad) == 4:
             flat = tuple(float(v) for pt in quad for v in pt)
         else:
             flat = (
@@ -136,7 +137,7 @@ class SimilarityManager(QtCore.QObject):
             if base_prev is None:
                 return
             mov_prev = self.canvas._get_preview(path)
-            params = self.canvas.params.get(path, {}).copy()
+            params = (self.canvas.params.get(path) or ImgParams()).copy()
             pw, ph = self.canvas.pw, self.canvas.ph
         except Exception:
             return
@@ -0,0 +1,76 @@
+"""Optional Numba kernels for the preview compose path.
+
+Numba is not a hard dependency. ``overlay_kernel`` stays None until
+``warm_up`` has compiled it, so the first overlay paint never waits on the
+JIT; ``warm_up`` is meant to run off the GUI thread. While it is None (numba
+missing, still compiling, or compilation failed) callers keep the
+OpenCV/NumPy implementation. The kernel rounds half up where
+cv2.addWeighted rounds half to even, so the two paths can differ by one
+grey level on exact ties.
+"""
+
+from __future__ import annotations
+
+import threading
+
+import numpy as np
+
+try:
+    from numba import njit  # type: ignore
+except ImportError:
+    njit = None
+
+overlay_kernel = None  # published by warm_up()
+_overlay_jit = None
+_warm_lock = threading.Lock()
+
+
+if njit is not None:
+
+    def _overlay(base, warped, alpha, out):
+        """out = alpha*warped + (1-alpha)*base where warped is non-black, else base."""
+        h, w = base.shape[0], base.shape[1]
+        beta = 1.0 - alpha
+        for i in range(h):
+            for j in range(w):
+                w0 = warped[i, j, 0]
+                w1 = warped[i, j, 1]
+                w2 = warped[i, j, 2]
+                if w0 | w1 | w2:
+                    for c in range(3):
+                        v = beta * base[i, j, c] + alpha * warped[i, j, c] + 0.5
+                        out[i, j, c] = np.uint8(min(255.0, max(0.0, v)))
+                else:
+                    for c in range(3):
+                        out[i, j, c] = base[i, j, c]
+
+    # Serial on purpose: the kernel runs on the compose worker thread, and
+    # parallel launches from a non-main thread can hang interpreter exit
+    # (TBB threading layer).
+    try:
+        _overlay_jit = njit(cache=True)(_overlay)
+    except Exception:  # no writable cache location (read-only/frozen install)
+        _overlay_jit = njit(_overlay)
+
+
+def warm_up() -> None:
+    """Compile the overlay kernel for the canvas' array layouts, then publish it.
+
+    Covers a read-only base (the base preview) and a writable one (its
+    display-size copy). Compilation is then frozen: a call with any other
+    layout raises TypeError instead of compiling on the GUI thread.
+    """
+    global overlay_kernel
+    with _warm_lock:
+        if _overlay_jit is None or overlay_kernel is not None:
+            return
+        try:
+            buf = np.zeros((2, 2, 3), np.uint8)
+            frozen = buf.copy()
+            frozen.flags.writeable = False
+            for base in (buf, frozen):
+                _overlay_jit(base, buf, 0.5, np.empty_like(buf))
+            _overlay_jit.disable_compile()
+        except Exception:  # pylint: disable=broad-except
+            return  # keep the OpenCV/NumPy path
+        overlay_kernel = _overlay_jit
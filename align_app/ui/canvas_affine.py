@@ -2,27 +2,61 @@
 
 from __future__ import annotations
 
-from typing import Dict
+from functools import lru_cache
+from typing import Optional, Tuple
 
 import cv2  # type: ignore
 import numpy as np
 
 # pylint: disable=no-member
 
+from . import _compose_numba
+from .canvas_params import ImgParams
 
-def affine_params_to_small(
-    mov_prev: np.ndarray, params: Dict[str, object]
-) -> np.ndarray:
+# Up to this many elements (~VGA, 3 channels) the fused Numba overlay beats the
+# multi-pass OpenCV/NumPy version; above it OpenCV's SIMD kernels win.
+_NUMBA_OVERLAY_MAX = 640 * 480 * 3
+
+# Warp matrices stay float32/float64: warpAffine/warpPerspective assert on any
+# other coefficient type. The fast 8UC3 INTER_LINEAR kernels (OpenCV >= 4.10,
+# see requirements.txt) are picked by image type, not matrix precision.
+
+
+def affine_params_to_small(mov_prev: np.ndarray, params: ImgParams) -> np.ndarray:
     """Return 2x3 affine matrix in PREVIEW space from params."""
     h, w = mov_prev.shape[:2]
     cx, cy = w / 2.0, h / 2.0
-    theta = float(params.get("theta", 0.0))
-    scale = float(params.get("scale", 1.0))
-    tx = float(params.get("tx", 0.0))
-    ty = float(params.get("ty", 0.0))
-    m = cv2.getRotationMatrix2D((cx, cy), theta, scale)
-    m[0, 2] += tx
-    m[1, 2] += ty
+    m = cv2.getRotationMatrix2D((cx, cy), params.theta, params.scale)
+    m[0, 2] += params.tx
+    m[1, 2] += params.ty
+    return m
+
+
+def affine_params_to_full(
+    prev_shape: Tuple[int, ...],
+    params: ImgParams,
+    preview_scale: float,
+    out: Optional[np.ndarray] = None,
+) -> np.ndarray:
+    """Return the full-res 2x3 affine for params directly (no preview matrix).
+
+    Equivalent to ``affine_lift_small_to_full(s, affine_params_to_small(...))``:
+    the rotation/scale part is unchanged by the lift and the translation is
+    divided by the preview scale. Written into ``out`` (2x3 float32) if given.
+    """
+    h, w = prev_shape[:2]
+    cx, cy = w / 2.0, h / 2.0
+    theta = np.deg2rad(params.theta)
+    a = params.scale * np.cos(theta)
+    b = params.scale * np.sin(theta)
+    inv_s = 1.0 / preview_scale
+    m = out if out is not None else np.empty((2, 3), dtype=np.float32)
+    m[0, 0] = a
+    m[0, 1] = b
+    m[0, 2] = ((1.0 - a) * cx - b * cy + params.tx) * inv_s
+    m[1, 0] = -b
+    m[1, 1] = a
+    m[1, 2] = (b * cx + (1.0 - a) * cy + params.ty) * inv_s
     return m
 
 
@@ -36,19 +70,155 @@ def affine_lift_small_to_full(preview_scale: float, m_small: np.ndarray) -> np.n
     return w[:2, :]
 
 
-def _overlay(base: np.ndarray, warped: np.ndarray, alpha: float) -> np.ndarray:
-    mask = (warped > 0).any(axis=2).astype(np.uint8) * 255
-    mask3 = cv2.cvtColor(mask, cv2.COLOR_GRAY2BGR)
-    return np.where(mask3 > 0, cv2.addWeighted(base, 1 - alpha, warped, alpha, 0), base)
+def opencl_available() -> bool:
+    """True when OpenCV can dispatch UMat operations to an OpenCL device."""
+    try:
+        return bool(cv2.ocl.haveOpenCL() and cv2.ocl.useOpenCL())
+    except cv2.error:
+        return False
+
+
+def _integer_shift(m: np.ndarray) -> Optional[Tuple[int, int]]:
+    """(dx, dy) when a 2x3 affine is a whole-pixel translation, else None.
+
+    The identity (fresh/reset image) and pure arrow-key nudges hit this; such a
+    warp is an exact shifted copy, no interpolation needed.
+    """
+    if (
+        abs(m[0, 0] - 1.0) < 1e-6
+        and abs(m[1, 1] - 1.0) < 1e-6
+        and abs(m[0, 1]) < 1e-6
+        and abs(m[1, 0]) < 1e-6
+    ):
+        dx, dy = round(float(m[0, 2])), round(float(m[1, 2]))
+        if abs(m[0, 2] - dx) < 1e-3 and abs(m[1, 2] - dy) < 1e-3:
+            return int(dx), int(dy)
+    return None
+
+
+def _shift_copy(
+    src: np.ndarray,
+    shift: Tuple[int, int],
+    dsize: Tuple[int, int],
+    dst: Optional[np.ndarray] = None,
+) -> np.ndarray:
+    """Whole-pixel translation: src shifted by (dx, dy) into a zero-bordered canvas."""
+    dx, dy = shift
+    w, h = dsize
+    out = dst if dst is not None else np.empty((h, w) + src.shape[2:], src.dtype)
+    x0, x1 = max(0, dx), min(w, src.shape[1] + dx)
+    y0, y1 = max(0, dy), min(h, src.shape[0] + dy)
+    if x0 >= x1 or y0 >= y1:
+        out[...] = 0
+        return out
+    out[y0:y1, x0:x1] = src[y0 - dy : y1 - dy, x0 - dx : x1 - dx]
+    out[:y0] = 0
+    out[y1:] = 0
+    out[y0:y1, :x0] = 0
+    out[y0:y1, x1:] = 0
+    return out
+
+
+def warp_full(
+    img: np.ndarray,
+    mat: np.ndarray,
+    dsize: Tuple[int, int],
+    flags: int = cv2.INTER_LINEAR,
+    use_opencl: bool = False,
+) -> np.ndarray:
+    """Warp a full-res image with a 2x3 (affine) or 3x3 (perspective) matrix.
+
+    With ``use_opencl`` and an OpenCL device available the warp runs through
+    OpenCV's T-API (UMat) on the GPU and is downloaded once at the end.
+    On the CPU, warpAffine/warpPerspective already split the output rows
+    over OpenCV's own thread pool.
+    """
+    img = np.ascontiguousarray(img)  # no copy unless given a strided view
+    persp = mat.shape[0] == 3
+    shift = None if persp else _integer_shift(mat)
+    if shift is not None:
+        return _shift_copy(img, shift, dsize)
+    warp = cv2.warpPerspective if persp else cv2.warpAffine
+    if use_opencl and opencl_available():
+        res = warp(
+            cv2.UMat(img),
+            mat,
+            dsize,
+            flags=flags,
+            borderMode=cv2.BORDER_CONSTANT,
+            borderValue=(0, 0, 0),
+        )
+        return res.get()
+    return warp(
+        img,
+        mat,
+        dsize,
+        flags=flags,
+        borderMode=cv2.BORDER_CONSTANT,
+        borderValue=(0, 0, 0),
+    )
+
+
+def _overlay(
+    base: np.ndarray,
+    warped: np.ndarray,
+    alpha: float,
+    out: Optional[np.ndarray] = None,
+) -> np.ndarray:
+    """Blend warped over base where warped has content; written into out if given."""
+    kernel = _compose_numba.overlay_kernel
+    if kernel is not None and base.size <= _NUMBA_OVERLAY_MAX:
+        if out is None:
+            out = np.empty_like(base)
+        try:
+            kernel(base, warped, float(alpha), out)
+            return out
+        except TypeError:
+            pass  # layout the kernel was not compiled for; it never JITs here
+    empty = ~warped.any(axis=2)
+    blended = cv2.addWeighted(base, 1 - alpha, warped, alpha, 0, dst=out)
+    # (h, w, 1) mask broadcasts over channels: no 3-channel mask copy
+    np.copyto(blended, base, where=empty[..., None])
+    return blended
+
+
+def _compose_target(
+    base_prev: np.ndarray,
+    warped: np.ndarray,
+    overlay: bool,
+    alpha: float,
+    outline: bool,
+    blend_dst: Optional[np.ndarray],
+) -> np.ndarray:
+    """Return the image annotations are drawn on, leaving warped untouched.
+
+    When the caller supplies ``blend_dst`` the raw warp is kept intact so it can
+    be passed back as ``warped=`` on the next frame.
+    """
+    if overlay:
+        return _overlay(base_prev, warped, alpha, out=blend_dst)
+    if outline and blend_dst is not None:
+        np.copyto(blend_dst, warped)
+        return blend_dst
+    return warped
+
+
+@lru_cache(maxsize=8)
+def image_corners(w: int, h: int) -> np.ndarray:
+    """Shared read-only (4, 2) float32 corners TL,TR,BR,BL of a w x h image."""
+    c = np.array([[0, 0], [w - 1, 0], [w - 1, h - 1], [0, h - 1]], dtype=np.float32)
+    c.flags.writeable = False
+    return c
+
+
+def transform_corners(w: int, h: int, m: np.ndarray) -> np.ndarray:
+    """Apply a 2x3 affine to the image corners: (4, 2) float64."""
+    return image_corners(w, h) @ m[:, :2].T + m[:, 2]
 
 
 def _outline(img: np.ndarray, mov_prev: np.ndarray, m_small: np.ndarray) -> None:
     h, w = mov_prev.shape[:2]
-    corners = np.float32([[0, 0], [w - 1, 0], [w - 1, h - 1], [0, h - 1]]).reshape(
-        -1, 1, 2
-    )
-    m3 = np.vstack([m_small, [0, 0, 1]]).astype(np.float32)
-    tc = cv2.perspectiveTransform(corners, m3).astype(int).reshape(-1, 2)
+    tc = transform_corners(w, h, m_small).astype(np.int32)
     cv2.polylines(img, [tc], True, (0, 255, 255), 1, cv2.LINE_AA)
 
 
@@ -59,20 +229,35 @@ def affine_compose_preview(
     overlay: bool,
     alpha: float,
     outline: bool,
+    flags: int = cv2.INTER_LINEAR,
+    dst: Optional[np.ndarray] = None,
+    blend_dst: Optional[np.ndarray] = None,
+    warped: Optional[np.ndarray] = None,
 ) -> np.ndarray:
-    """Warp mov_prev in PREVIEW space to base_prev dims and compose/annotate."""
+    """Warp mov_prev in PREVIEW space to base_prev dims and compose/annotate.
+
+    ``flags`` selects the interpolation; callers pass ``cv2.INTER_NEAREST``
+    while the user is dragging and the default once the interaction settles.
+    ``dst``/``blend_dst`` are optional (ph, pw, 3) uint8 buffers reused across
+    calls for the warp and overlay results. ``warped`` is a previous warp for
+    the same matrix; when given, the warp itself is skipped.
+    """
+    mov_prev = np.ascontiguousarray(mov_prev)  # no copy unless given a view
     ph, pw = base_prev.shape[:2]
-    warped = cv2.warpAffine(
-        mov_prev,
-        m_small,
-        (pw, ph),
-        flags=cv2.INTER_LINEAR,
-        borderMode=cv2.BORDER_CONSTANT,
-        borderValue=(0, 0, 0),
-    )
-    out = warped
-    if overlay:
-        out = _overlay(base_prev.copy(), warped, alpha)
+    shift = _integer_shift(m_small) if warped is None else None
+    if shift is not None:
+        warped = _shift_copy(mov_prev, shift, (pw, ph), dst)
+    elif warped is None:
+        warped = cv2.warpAffine(
+            mov_prev,
+            m_small,
+            (pw, ph),
+            dst=dst,
+            flags=flags,
+            borderMode=cv2.BORDER_CONSTANT,
+            borderValue=(0, 0, 0),
+        )
+    out = _compose_target(base_prev, warped, overlay, alpha, outline, blend_dst)
     if outline:
         _outline(out, mov_prev, m_small)
     return out
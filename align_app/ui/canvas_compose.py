@@ -0,0 +1,234 @@
+"""Right-panel compose (warp + overlay + outline + resize) and its worker thread.
+
+The canvas describes a frame as a ComposeJob. PanelComposer renders it to a
+QImage; ComposeWorker does the same on a QThread so paintEvent never blocks
+on the warp and only draws the last finished image.
+"""
+
+from __future__ import annotations
+
+import threading
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+# pylint: disable=no-member
+import cv2  # type: ignore
+import numpy as np
+from PyQt5 import QtCore, QtGui  # pylint: disable=no-name-in-module
+
+from align_app.utils.img_io import bgr_to_qimage, ensure_buffer
+from .canvas_affine import _integer_shift, affine_compose_preview, opencl_available
+from .canvas_perspective import (
+    Quad,
+    perspective_with_affine_compose_preview,
+    preview_homography,
+)
+
+
+@dataclass(frozen=True)
+class ComposeJob:
+    """Everything needed to render the right panel; arrays are never mutated."""
+
+    key: tuple  # right-panel cache key (warp_key + display options + size)
+    warp_key: tuple  # identifies the raw warp (path, preview, flags, matrix, quad)
+    base_prev: np.ndarray
+    mov_prev: np.ndarray
+    m_small: np.ndarray
+    dest_quad: Optional[Quad]  # None -> affine only
+    overlay: bool
+    alpha: float
+    outline: bool
+    flags: int
+    size: Tuple[int, int]  # content size (w_img, h_img) in draw px
+    resize_flags: int = cv2.INTER_AREA  # preview -> content size interpolation
+    use_opencl: bool = False  # warp on the GPU (T-API) when a device exists
+
+
+class PanelComposer:
+    """Reused warp/overlay buffers and the last-warp cache of one thread."""
+
+    def __init__(self) -> None:
+        # _warp_buf holds the raw warp for _warp_key; jobs with the same key
+        # (alpha/overlay/outline changes) skip the warp entirely.
+        self._warp_buf: Optional[np.ndarray] = None
+        self._blend_buf: Optional[np.ndarray] = None
+        self._warp_key: Optional[tuple] = None
+        # Base preview resized to the content size for fused jobs. The source
+        # array is held so an identity check cannot match a recycled id().
+        self._base_src: Optional[np.ndarray] = None
+        self._base_scaled: Optional[np.ndarray] = None
+        self._base_scaled_key: Optional[tuple] = None
+        # Device copy of the moving preview, uploaded once per image
+        self._mov_src: Optional[np.ndarray] = None
+        self._mov_umat: Optional[cv2.UMat] = None
+
+    def invalidate(self) -> None:
+        self._warp_key = None
+        self._base_src = None
+        self._mov_src = self._mov_umat = None
+
+    def _scaled_base(
+        self, base_prev: np.ndarray, size: Tuple[int, int], flags: int
+    ) -> np.ndarray:
+        if base_prev is not self._base_src or (size, flags) != self._base_scaled_key:
+            self._base_scaled = cv2.resize(base_prev, size, interpolation=flags)
+            self._base_src = base_prev
+            self._base_scaled_key = (size, flags)
+        return self._base_scaled
+
+    def _warp_opencl(
+        self,
+        mov_prev: np.ndarray,
+        mat: np.ndarray,
+        size: Tuple[int, int],
+        flags: int,
+    ) -> Optional[np.ndarray]:
+        """Warp with a 2x3 or 3x3 matrix on the OpenCL device, or None.
+
+        None leaves the warp to the CPU path; whole-pixel shifts stay there
+        because a strided copy beats the upload.
+        """
+        persp = mat.shape[0] == 3
+        if not persp and _integer_shift(mat) is not None:
+            return None
+        if mov_prev is not self._mov_src:
+            self._mov_umat = cv2.UMat(mov_prev)
+            self._mov_src = mov_prev
+        warp = cv2.warpPerspective if persp else cv2.warpAffine
+        res = warp(
+            self._mov_umat,
+            mat,
+            size,
+            flags=flags,
+            borderMode=cv2.BORDER_CONSTANT,
+            borderValue=(0, 0, 0),
+        )
+        return res.get()
+
+    def render(self, job: ComposeJob) -> QtGui.QImage:
+        base_prev, m_small, dest_quad = job.base_prev, job.m_small, job.dest_quad
+        # Perspective warp, solved in preview space
+        h_mat = None
+        if dest_quad is not None:
+            h_mat = preview_homography(job.mov_prev, dest_quad, m_small)
+        ph, pw = base_prev.shape[:2]
+        w_img, h_img = job.size
+        scaled = w_img > 0 and h_img > 0 and (w_img, h_img) != (pw, ph)
+        # For moderate downscales (the display filter is not INTER_AREA) fold
+        # the preview -> content scale into the warp itself: one resample at
+        # the smaller final size instead of a full warp plus a resize. Zoomed
+        # in it is cheaper to warp/overlay at preview size and scale up.
+        fuse = (
+            scaled
+            and w_img <= pw
+            and h_img <= ph
+            and job.resize_flags != cv2.INTER_AREA
+        )
+        if fuse:
+            sx, sy = w_img / pw, h_img / ph
+            base_prev = self._scaled_base(base_prev, job.size, job.resize_flags)
+            # Map the output side only (S @ M, S @ H); the source side stays in
+            # preview px. S is cv2.resize's pixel-centre mapping,
+            # x' = sx * (x + 0.5) - 0.5. The quad is mapped for the outline.
+            s_mat = np.array(
+                [[sx, 0.0, 0.5 * (sx - 1.0)], [0.0, sy, 0.5 * (sy - 1.0)], [0, 0, 1]]
+            )
+            if h_mat is not None:
+                h_mat = s_mat @ h_mat
+                dest_quad = [
+                    (sx * x + s_mat[0, 2], sy * y + s_mat[1, 2]) for (x, y) in dest_quad
+                ]
+            else:
+                m_small = s_mat[:2] @ np.vstack([m_small, (0.0, 0.0, 1.0)])
+
+        buf_shape = base_prev.shape[:2] + (3,)
+        self._warp_buf = ensure_buffer(self._warp_buf, buf_shape)
+        self._blend_buf = ensure_buffer(self._blend_buf, buf_shape)
+        warp_key = (job.warp_key, job.size if fuse else None)
+        warped = self._warp_buf if warp_key == self._warp_key else None
+        self._warp_key = warp_key
+        if warped is None and job.use_opencl and opencl_available():
+            warped = self._warp_opencl(
+                job.mov_prev,
+                h_mat if h_mat is not None else m_small,
+                buf_shape[1::-1],
+                job.flags,
+            )
+            if warped is not None:
+                self._warp_buf = warped
+
+        if dest_quad is not None:
+            right_bgr = perspective_with_affine_compose_preview(
+                base_prev=base_prev,
+                mov_prev=job.mov_prev,
+                dest_quad=dest_quad,
+                m_small=m_small,
+                overlay=job.overlay,
+                alpha=job.alpha,
+                outline=job.outline,
+                flags=job.flags,
+                dst=self._warp_buf,
+                blend_dst=self._blend_buf,
+                warped=warped,
+                h_mat=h_mat,
+            )
+        else:
+            right_bgr = affine_compose_preview(
+                base_prev=base_prev,
+                mov_prev=job.mov_prev,
+                m_small=m_small,
+                overlay=job.overlay,
+                alpha=job.alpha,
+                outline=job.outline,
+                flags=job.flags,
+                dst=self._warp_buf,
+                blend_dst=self._blend_buf,
+                warped=warped,
+            )
+
+        if scaled and not fuse:
+            right_bgr = cv2.resize(
+                right_bgr, (w_img, h_img), interpolation=job.resize_flags
+            )
+        return bgr_to_qimage(right_bgr)
+
+
+class ComposeWorker(QtCore.QObject):
+    """Renders ComposeJobs on its own thread, always the most recent one.
+
+    ``submit`` may be called any number of times per frame from the GUI
+    thread; jobs that were superseded before the worker got to them are
+    dropped. Results arrive through ``ready`` (queued to the GUI thread).
+    """
+
+    ready = QtCore.pyqtSignal(object, object)  # (job key, QImage)
+    _wake = QtCore.pyqtSignal()
+
+    def __init__(self) -> None:
+        super().__init__()
+        self._composer = PanelComposer()
+        self._lock = threading.Lock()
+        self._pending: Optional[ComposeJob] = None
+        self._reset = False
+        self._wake.connect(self._run)
+
+    def submit(self, job: ComposeJob) -> None:
+        with self._lock:
+            self._pending = job
+        self._wake.emit()
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._pending = None
+            self._reset = True
+
+    @QtCore.pyqtSlot()
+    def _run(self) -> None:
+        with self._lock:
+            job, self._pending = self._pending, None
+            reset, self._reset = self._reset, False
+        if reset:
+            self._composer.invalidate()
+        if job is None:  # already handled by an earlier wake-up
+            return
+        self.ready.emit(job.key, self._composer.render(job))
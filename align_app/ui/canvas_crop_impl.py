@@ -1,12 +1,31 @@
 from __future__ import annotations
 
-from typing import Callable, Optional
+import os
+import shutil
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+from typing import Callable, List, Optional, Tuple, Union
 
 # pylint: disable=no-member
 import cv2  # type: ignore
+import numpy as np
 from PyQt5 import QtCore, QtWidgets  # type: ignore
 
-from align_app.utils.img_io import load_image_bgr
+from align_app.utils.img_io import (
+    PNG_ENCODE_PARAMS,
+    ensure_dir,
+    is_plain_png,
+    load_image_bgr_roi,
+    load_png_bgr_roi,
+)
+
+# (output path, PNG data) produced by a crop worker; None if the file failed
+_CropOutput = Optional[Tuple[Path, Union[bytes, np.ndarray]]]
+# FAT/exFAT store mtimes in 2 s steps (some network mounts are as coarse): a
+# folder listed within that long of its mtime may still gain entries that do
+# not change it, so such listings are not reused.
+_LISTING_SETTLE_NS = 2_000_000_000
 
 
 class CanvasCropMixin:
@@ -18,6 +37,8 @@ class CanvasCropMixin:
         self.crop_origin: Optional[QtCore.QPoint] = None
         self.crop_rect_px: Optional[QtCore.QRect] = None
         self.crop_from_aligned: bool = True  # user choice remembered
+        # (dir, dir mtime_ns, PNGs) of the last aligned-folder listing
+        self._align_listing_cache: Optional[Tuple[Path, int, List[Path]]] = None
 
     def start_crop_mode(self, use_aligned: Optional[bool]) -> None:
         """Enter crop mode; if use_aligned is None, ask the user."""
@@ -62,6 +83,43 @@ class CanvasCropMixin:
             "Drag a rectangle on the BASE (left) panel.\nRelease mouse to confirm.",
         )
 
+    def _aligned_files(self) -> List[Path]:
+        """PNGs directly in align_out, sorted; relisted only when the folder changes.
+
+        The extension match and the sort are case-insensitive, like
+        list_images, so the crop order never depends on the filesystem's
+        enumeration order. Adding, removing or renaming an entry bumps the
+        directory mtime, so repeated crops of an unchanged folder skip the scan,
+        as long as that mtime had settled (_LISTING_SETTLE_NS) when it was listed.
+        """
+        if not self.align_out:
+            return []
+        try:
+            mtime = self.align_out.stat().st_mtime_ns
+        except OSError:
+            return []
+        cached = self._align_listing_cache
+        if cached is not None and cached[0] == self.align_out and cached[1] == mtime:
+            return cached[2]
+        with os.scandir(self.align_out) as it:
+            # dot-files are skipped, as glob("*.png") would
+            names = sorted(
+                (
+                    e.name
+                    for e in it
+                    if e.name.lower().endswith(".png")
+                    and not e.name.startswith(".")
+                    and e.is_file()
+                ),
+                key=str.lower,
+            )
+        files = [self.align_out / name for name in names]
+        if time.time_ns() - mtime >= _LISTING_SETTLE_NS:
+            self._align_listing_cache = (self.align_out, mtime, files)
+        else:
+            self._align_listing_cache = None  # same mtime tick may still grow
+        return files
+
     def _confirm_crop_all(self) -> None:
         """Crop base + selected (aligned or source) with a progress callback."""
         if not self.crop_rect_px or self.base_full is None or not self.crop_out:
@@ -78,37 +136,44 @@ class CanvasCropMixin:
         if self.ds == 0:
             return
 
-        # draw -> preview
-        xp = xw / self.ds
-        yp = yw / self.ds
-        wp = ww / self.ds
-        hp_ = hw / self.ds
-
-        # preview -> full
-        cx = int(round(xp / self.s))
-        cy = int(round(yp / self.s))
-        cw = int(round(wp / self.s))
-        ch = int(round(hp_ / self.s))
+        # draw -> preview -> full in one scale
+        inv = 1.0 / (self.ds * self.s)
+        cx, cy, cw, ch = (int(round(v * inv)) for v in (xw, yw, ww, hw))
 
         bw, bh = self.base_full.shape[1], self.base_full.shape[0]
         cx = max(0, min(cx, bw - 2))
         cy = max(0, min(cy, bh - 2))
         cw = max(2, min(cw, bw - cx))
         ch = max(2, min(ch, bh - cy))
+        roi = (slice(cy, cy + ch), slice(cx, cx + cw))  # shared by every file
+        # A full-frame crop of an 8-bit RGB PNG is the file itself: such files
+        # are passed through instead of decoded and re-encoded.
+        whole = (cx, cy, cw, ch) == (0, 0, bw, bh)
 
-        self.crop_out.mkdir(parents=True, exist_ok=True)
+        ensure_dir(self.crop_out)
 
         # Base crop
-        base_crop = self.base_full[cy : cy + ch, cx : cx + cw]
+        base_crop = self.base_full[roi]
         if self.base_path is not None:
             out_name_base = f"{self.base_path.stem}.png"
         else:
             out_name_base = "base.png"
-        cv2.imwrite(str((self.crop_out / out_name_base)), base_crop)
+        base_out = self.crop_out / out_name_base
+        if (
+            whole
+            and self.base_path is not None
+            and is_plain_png(self.base_path, bw, bh)
+        ):
+            try:
+                shutil.copyfile(self.base_path, base_out)
+            except shutil.SameFileError:
+                pass  # cropping into the base's own folder: already there
+        else:
+            cv2.imwrite(str(base_out), base_crop, PNG_ENCODE_PARAMS)
 
         # Decide list
         if self.crop_from_aligned:
-            file_list = list(self.align_out.glob("*.png")) if self.align_out else []
+            file_list = self._aligned_files()
         else:
             file_list = self.files
 
@@ -127,28 +192,92 @@ class CanvasCropMixin:
         else:
             notify_fn = _noop_progress
 
-        for pth in file_list:
-            if self.crop_from_aligned:
+        crop_out = self.crop_out
+
+        def _encode(crop, out_name: str) -> _CropOutput:
+            # The encoded ndarray is written through the buffer protocol as is;
+            # no bytes copy of it is made.
+            ok, buf = cv2.imencode(".png", crop, PNG_ENCODE_PARAMS)
+            return (crop_out / out_name, buf) if ok else None
+
+        def _crop_aligned(pth: Path) -> _CropOutput:
+            if whole and is_plain_png(pth, bw, bh):
+                return crop_out / pth.name, pth.read_bytes()
+            img = self.cached_aligned(pth)
+            if img is None:
+                # Region-only decode with pyvips, else the full image
+                crop = load_png_bgr_roi(str(pth), cx, cy, cw, ch)
+                if crop is not None:
+                    return _encode(crop, pth.name)
                 img = cv2.imread(str(pth), cv2.IMREAD_COLOR)
-                if img is None:
-                    done += 1
-                    notify_fn(done, total)
-                    continue
-                out_name = pth.name
-            else:
-                img = load_image_bgr(str(pth))
-                out_name = f"{pth.stem}.png"
+            if img is None:
+                return None
+            # A row-strided view maps onto a cv::Mat step with no copy;
+            # np.ascontiguousarray first only adds one (measured slower).
+            return _encode(img[roi], pth.name)
 
-            crop = img[cy : cy + ch, cx : cx + cw]
-            cv2.imwrite(str(self.crop_out / out_name), crop)
+        def _crop_source(pth: Path) -> _CropOutput:
+            if whole and is_plain_png(pth, bw, bh):
+                return crop_out / f"{pth.stem}.png", pth.read_bytes()
+            crop = load_image_bgr_roi(str(pth), cx, cy, cw, ch)
+            return _encode(crop, f"{pth.stem}.png")
 
-            done += 1
-            notify_fn(done, total)
+        worker = _crop_aligned if self.crop_from_aligned else _crop_source
 
-        notify_fn(total, total)
+        # Workers decode/crop/encode in memory (OpenCV releases the GIL, so
+        # files overlap across cores); this thread is the single writer, so
+        # disk writes overlap the remaining encodes and progress follows them.
+        # Progress goes out per 1% of files or every 50 ms, whichever is first:
+        # the progress bar may repaint synchronously on each update.
+        notify_step = max(1, total // 100)
+        last_done, last_t = 0, time.monotonic()
+        n_workers = max(1, min(os.cpu_count() or 1, total))
+        # The pool size alone bounds the parallelism: PNG/JPEG decode and
+        # encode do not use OpenCV's parallel_for pool, so there is nothing to
+        # oversubscribe (and cv2.setNumThreads is process-wide, which would
+        # also throttle a concurrent compose).
+        # Window-modal progress with Cancel; only shown if the batch takes a
+        # while (QProgressDialog's minimumDuration). setValue on a modal
+        # dialog processes events, so the UI stays live between updates.
+        dlg = QtWidgets.QProgressDialog("Cropping...", "Cancel", 0, total, self)
+        dlg.setWindowModality(QtCore.Qt.WindowModal)
+        cancelled = False
+        try:
+            with ThreadPoolExecutor(max_workers=n_workers) as ex:
+                futures = [ex.submit(worker, pth) for pth in file_list]
+                for fut in as_completed(futures):
+                    encoded = fut.result()
+                    if encoded is not None:
+                        encoded[0].write_bytes(encoded[1])
+                    done += 1
+                    now = time.monotonic()
+                    if done - last_done >= notify_step or now - last_t > 0.05:
+                        notify_fn(done, total)
+                        dlg.setValue(done)
+                        last_done, last_t = done, now
+                    if dlg.wasCanceled():
+                        cancelled = True
+                        for f in futures:
+                            f.cancel()  # queued files only; running ones finish
+                        break
+        finally:
+            dlg.reset()
 
-        QtWidgets.QMessageBox.information(
-            self,
-            "Cropped",
-            f"Cropped {'aligned' if self.crop_from_aligned else 'source'} images -> {self.crop_out}",
-        )
+        if cancelled:
+            # Report how far the batch got, then clear the bar (total 0): a
+            # partial count is never followed by a completing one.
+            notify_fn(done, total)
+            notify_fn(0, 0)
+        else:
+            notify_fn(total, total)
+
+        kind = "aligned" if self.crop_from_aligned else "source"
+        if cancelled:
+            msg = f"Cropping cancelled after {done} of {total} {kind} images"
+        else:
+            msg = f"Cropped {total} {kind} images -> {self.crop_out}"
+        status_fn = getattr(self, "_emit_status_message", None)
+        if callable(status_fn):
+            status_fn(msg)
+        else:
+            QtWidgets.QMessageBox.information(self, "Cropped", msg)
@@ -1,5 +1,7 @@
 from __future__ import annotations
 
+# pylint: disable=no-member
+import cv2  # type: ignore
 from PyQt5 import QtCore, QtGui  # pylint: disable=no-name-in-module
 from .canvas_perspective import ensure_perspective_quad
 
@@ -7,6 +9,54 @@ from .canvas_perspective import ensure_perspective_quad
 class CanvasInteractMixin:
     """Mouse & keyboard interactions."""
 
+    # Per-mode key actions: key -> action(canvas, gesture). Steps are read at
+    # dispatch time so step changes apply to the next key press.
+    _AFFINE_KEYS = {
+        QtCore.Qt.Key_Left: lambda c, g: c.move_dxdy(-c.step, 0, g),
+        QtCore.Qt.Key_A: lambda c, g: c.move_dxdy(-c.step, 0, g),
+        QtCore.Qt.Key_Right: lambda c, g: c.move_dxdy(+c.step, 0, g),
+        QtCore.Qt.Key_D: lambda c, g: c.move_dxdy(+c.step, 0, g),
+        QtCore.Qt.Key_Up: lambda c, g: c.move_dxdy(0, -c.step, g),
+        QtCore.Qt.Key_W: lambda c, g: c.move_dxdy(0, -c.step, g),
+        QtCore.Qt.Key_Down: lambda c, g: c.move_dxdy(0, +c.step, g),
+        QtCore.Qt.Key_S: lambda c, g: c.move_dxdy(0, +c.step, g),
+        QtCore.Qt.Key_BracketLeft: lambda c, g: c.rotate_deg(-c.rot_step, g),
+        QtCore.Qt.Key_BracketRight: lambda c, g: c.rotate_deg(+c.rot_step, g),
+        QtCore.Qt.Key_Comma: lambda c, g: c.zoom_factor(1.0 - c.scale_step, g),
+        QtCore.Qt.Key_Period: lambda c, g: c.zoom_factor(1.0 + c.scale_step, g),
+        QtCore.Qt.Key_Z: lambda c, g: c.zoom_factor(1.0 - c.micro_scale_step, g),
+        QtCore.Qt.Key_X: lambda c, g: c.zoom_factor(1.0 + c.micro_scale_step, g),
+        QtCore.Qt.Key_Equal: lambda c, g: setattr(
+            c, "step", min(50.0, c.step + 1.0)
+        ),
+        QtCore.Qt.Key_Minus: lambda c, g: setattr(
+            c, "step", max(0.5, c.step - 0.5)
+        ),
+        QtCore.Qt.Key_O: lambda c, g: (
+            setattr(c, "overlay_mode", not c.overlay_mode),
+            c.update(),
+        ),
+        QtCore.Qt.Key_B: lambda c, g: (
+            setattr(c, "show_outline", not c.show_outline),
+            c.update(),
+        ),
+        QtCore.Qt.Key_0: lambda c, g: c.reset_current(),
+        QtCore.Qt.Key_Return: lambda c, g: c.save_current_aligned(),
+        QtCore.Qt.Key_Enter: lambda c, g: c.save_current_aligned(),
+    }
+    _PERSP_KEYS = {
+        QtCore.Qt.Key_Left: lambda c, g: c.nudge_corner(-c.persp_step, 0, g),
+        QtCore.Qt.Key_A: lambda c, g: c.nudge_corner(-c.persp_step, 0, g),
+        QtCore.Qt.Key_Right: lambda c, g: c.nudge_corner(c.persp_step, 0, g),
+        QtCore.Qt.Key_D: lambda c, g: c.nudge_corner(c.persp_step, 0, g),
+        QtCore.Qt.Key_Up: lambda c, g: c.nudge_corner(0, -c.persp_step, g),
+        QtCore.Qt.Key_W: lambda c, g: c.nudge_corner(0, -c.persp_step, g),
+        QtCore.Qt.Key_Down: lambda c, g: c.nudge_corner(0, c.persp_step, g),
+        QtCore.Qt.Key_S: lambda c, g: c.nudge_corner(0, c.persp_step, g),
+        QtCore.Qt.Key_Return: lambda c, g: c.save_current_aligned(),
+        QtCore.Qt.Key_Enter: lambda c, g: c.save_current_aligned(),
+    }
+
     def _init_interact(self) -> None:
         # attrs provided by CanvasViewMixin; ensure they exist for linters
         self.view_pan_xp = getattr(self, "view_pan_xp", 0.0)  # type: ignore[attr-defined]
@@ -28,6 +78,11 @@ class CanvasInteractMixin:
     # ---- events ----
     def mouseMoveEvent(self, evt: QtGui.QMouseEvent) -> None:  # noqa: N802
         pos = evt.pos()
+        content_moved = False
+        right_only = False  # only the right panel's content changed
+        old_cell = self.hover_cell
+        # draw px -> preview px for every branch below
+        sd = self.scale_draw if self.scale_draw else 1.0
 
         # View panning (hand tool) — convert draw px -> preview px with scale_draw
         if (
@@ -38,11 +93,10 @@ class CanvasInteractMixin:
         ):
             dx = pos.x() - self._pan_last.x()
             dy = pos.y() - self._pan_last.y()
-            sd = self.scale_draw if self.scale_draw else 1.0
             self.view_pan_xp -= dx / sd
             self.view_pan_yp -= dy / sd
             self._pan_last = pos
-            self.update()
+            content_moved = True
 
         # Perspective drag (right panel)
         if (
@@ -50,36 +104,30 @@ class CanvasInteractMixin:
             and self._persp_dragging
             and self._persp_last is not None
         ):
-            sd = self.scale_draw if self.scale_draw else 1.0
             dx_prev = (pos.x() - self._persp_last.x()) / sd
             dy_prev = (pos.y() - self._persp_last.y()) / sd
             path = self.current_path()
             if path:
-                if self._persp_last == self._persp_start_point:
-                    # first motion -> history snapshot
-                    self._push_history(path)
                 p = self.params[path]
                 ensure_perspective_quad(p, self.pw, self.ph)
-                quad = p["persp"]  # type: ignore[index]
-                x, y = quad[self.active_corner]
-                quad[self.active_corner] = (x + dx_prev, y + dy_prev)
-                p["persp"] = quad  # type: ignore[index]
+                quad = p.persp
+                corner = self.active_corner
+                x, y = quad[corner]
+                quad[corner] = (x + dx_prev, y + dy_prev)
+                # the whole drag is one undo step (token cleared on release)
+                self._push_delta(
+                    path, (("persp", corner),), ((x, y),), (quad[corner],), "drag"
+                )
             self._persp_last = pos
-            self.update()
+            self._schedule_update(self._right_panel_region())
             return
 
         # Hover cell (base frame only) — compute in draw px inside the frame
-        if self.left_rect.contains(pos):
-            step_draw = max(
-                1,
-                int(
-                    round(
-                        self.grid_step * (self.scale_draw if self.scale_draw else 1.0)
-                    )
-                ),
-            )
-            px = pos.x() - self.left_rect.x()
-            py = pos.y() - self.left_rect.y()
+        left = self.left_rect
+        if left.contains(pos):
+            step_draw = max(1, int(round(self.grid_step * sd)))
+            px = pos.x() - left.x()
+            py = pos.y() - left.y()
             gx0 = (px // step_draw) * step_draw
             gy0 = (py // step_draw) * step_draw
             gx1 = min(gx0 + step_draw, self.tw - 1)
@@ -97,26 +145,42 @@ class CanvasInteractMixin:
             and not self._is_persp_editing()
             and not self.pan_mode
         ):
-            sd = self.scale_draw if self.scale_draw else 1.0
             dx_prev = (pos.x() - self.drag_last.x()) / sd
             dy_prev = (pos.y() - self.drag_last.y()) / sd
             path = self.current_path()
             if path:
-                if self.drag_last == self._drag_start_point:
-                    self._push_history(path)
                 pr = self.params[path]
-                pr["tx"] = float(pr.get("tx", 0.0)) + dx_prev  # type: ignore[index]
-                pr["ty"] = float(pr.get("ty", 0.0)) + dy_prev  # type: ignore[index]
+                old = (pr.tx, pr.ty)
+                pr.tx += dx_prev
+                pr.ty += dy_prev
+                self._push_delta(path, ("tx", "ty"), old, (pr.tx, pr.ty), "drag")
             self.drag_last = pos
-            self.update()
+            right_only = not content_moved
+            content_moved = True
 
         # Crop rubber band (constrained to left frame)
         if self.crop_mode and self.crop_origin is not None:
             rect = QtCore.QRect(self.crop_origin, pos).normalized()
-            rect = rect.intersected(self.left_rect)
+            rect = rect.intersected(left)
             self.rubber.setGeometry(rect)
 
-        self.update()
+        if content_moved:
+            # One coalesced repaint per frame, however many moves arrive. An
+            # affine drag leaves the left panel as is: repaint the right one
+            # and any hover cells that changed.
+            region = None
+            if right_only:
+                region = self._right_panel_region()
+                if self.hover_cell != old_cell:
+                    region = region.united(self._hover_region(old_cell))
+                    region = region.united(self._hover_region(self.hover_cell))
+            self._schedule_update(region)
+        elif self.hover_cell != old_cell:
+            # Hover / rubber band only: the QRubberBand child repaints itself,
+            # so just the old and new highlight cells need repainting.
+            self.update(
+                self._hover_region(old_cell).united(self._hover_region(self.hover_cell))
+            )
 
     def mousePressEvent(self, evt: QtGui.QMouseEvent) -> None:  # noqa: N802
         pos = evt.pos()
@@ -129,6 +193,8 @@ class CanvasInteractMixin:
         ):
             self._view_panning = True
             self._pan_last = pos
+            # No NEAREST here: a view pan only moves the composed panel, so
+            # the cached LINEAR render stays valid
             self.setCursor(QtCore.Qt.ClosedHandCursor)
             return
 
@@ -144,6 +210,7 @@ class CanvasInteractMixin:
             self.dragging = True
             self.drag_last = pos
             self._drag_start_point = pos
+            self._live_flags = cv2.INTER_NEAREST
             self.setCursor(QtCore.Qt.ClosedHandCursor)
 
         # Begin perspective drag on right (choose nearest corner)
@@ -157,12 +224,14 @@ class CanvasInteractMixin:
             if path:
                 p = self.params[path]
                 ensure_perspective_quad(p, self.pw, self.ph)
-                quad = p["persp"]  # type: ignore[index]
-                mx = pos.x() - self.right_rect.x()
-                my = pos.y() - self.right_rect.y()
+                quad = p.persp
+                sd = self.scale_draw if self.scale_draw else 1.0
+                # Content is drawn shifted by the view pan (see paintEvent)
+                mx = pos.x() - self.right_rect.x() + int(round(self.view_pan_xp * sd))
+                my = pos.y() - self.right_rect.y() + int(round(self.view_pan_yp * sd))
                 best_i = None
                 best_d2 = None
-                sd = self.scale_draw if self.scale_draw else 1.0
+                # Scalar loop: ~1 us for 4 corners; a NumPy argmin costs ~12 us
                 for i, (qx, qy) in enumerate(quad):
                     dx = mx - qx * sd
                     dy = my - qy * sd
@@ -176,6 +245,7 @@ class CanvasInteractMixin:
                     self._persp_dragging = True
                     self._persp_last = pos
                     self._persp_start_point = pos
+                    self._live_flags = cv2.INTER_NEAREST
                     self.setCursor(QtCore.Qt.ClosedHandCursor)
                     return
 
@@ -190,6 +260,13 @@ class CanvasInteractMixin:
             self.rubber.show()
 
     def mouseReleaseEvent(self, evt: QtGui.QMouseEvent) -> None:  # noqa: N802
+        # A drag ends its undo step
+        self._gesture_token = None
+        # Interaction settled -> re-warp once with full-quality interpolation
+        if self._live_flags != cv2.INTER_LINEAR:
+            self._live_flags = cv2.INTER_LINEAR
+            self.update()
+
         if evt.button() == QtCore.Qt.LeftButton and self._view_panning:
             self._view_panning = False
             self._pan_last = None
@@ -253,58 +330,13 @@ class CanvasInteractMixin:
         if path is None:
             return
 
-        if not self._is_persp_editing():
-            if key in (QtCore.Qt.Key_Left, QtCore.Qt.Key_A):
-                self.move_dxdy(-self.step, 0)
-            elif key in (QtCore.Qt.Key_Right, QtCore.Qt.Key_D):
-                self.move_dxdy(+self.step, 0)
-            elif key in (QtCore.Qt.Key_Up, QtCore.Qt.Key_W):
-                self.move_dxdy(0, -self.step)
-            elif key in (QtCore.Qt.Key_Down, QtCore.Qt.Key_S):
-                self.move_dxdy(0, +self.step)
-
-            elif key == QtCore.Qt.Key_BracketLeft:
-                self.rotate_deg(-self.rot_step)
-            elif key == QtCore.Qt.Key_BracketRight:
-                self.rotate_deg(+self.rot_step)
-
-            elif key == QtCore.Qt.Key_Comma:
-                self.zoom_factor(1.0 - self.scale_step)
-            elif key == QtCore.Qt.Key_Period:
-                self.zoom_factor(1.0 + self.scale_step)
-            elif key == QtCore.Qt.Key_Z:
-                self.zoom_factor(1.0 - self.micro_scale_step)
-            elif key == QtCore.Qt.Key_X:
-                self.zoom_factor(1.0 + self.micro_scale_step)
-
-            elif key == QtCore.Qt.Key_Equal:
-                self.step = min(50.0, self.step + 1.0)
-            elif key == QtCore.Qt.Key_Minus:
-                self.step = max(0.5, self.step - 0.5)
-
-            elif key == QtCore.Qt.Key_O:
-                self.overlay_mode = not self.overlay_mode
-            elif key == QtCore.Qt.Key_B:
-                self.show_outline = not self.show_outline
-
-            elif key == QtCore.Qt.Key_0:
-                self.reset_current()
-
-            elif key in (QtCore.Qt.Key_Return, QtCore.Qt.Key_Enter, QtCore.Qt.Key_S):
-                self.save_current_aligned()
-
-        else:
-            dx = dy = 0.0
-            if key in (QtCore.Qt.Key_Left, QtCore.Qt.Key_A):
-                dx = -self.persp_step
-            elif key in (QtCore.Qt.Key_Right, QtCore.Qt.Key_D):
-                dx = self.persp_step
-            elif key in (QtCore.Qt.Key_Up, QtCore.Qt.Key_W):
-                dy = -self.persp_step
-            elif key in (QtCore.Qt.Key_Down, QtCore.Qt.Key_S):
-                dy = self.persp_step
-            if dx or dy:
-                self.nudge_corner(dx, dy)
+        # Autorepeat of a held key extends one undo step until keyReleaseEvent
+        keymap = self._PERSP_KEYS if self._is_persp_editing() else self._AFFINE_KEYS
+        action = keymap.get(key)
+        if action is not None:
+            action(self, f"key:{key}")
 
-            if key in (QtCore.Qt.Key_Return, QtCore.Qt.Key_Enter, QtCore.Qt.Key_S):
-                self.save_current_aligned()
+    def keyReleaseEvent(self, evt: QtGui.QKeyEvent) -> None:  # noqa: N802
+        # Autorepeat sends release/press pairs; only a real release ends the step
+        if not evt.isAutoRepeat():
+            self._gesture_token = None
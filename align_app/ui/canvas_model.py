@@ -1,29 +1,61 @@
 from __future__ import annotations
 
+import os
+import threading
+import time
+from collections import OrderedDict
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Set, Tuple
 
 # pylint: disable=no-member
 import cv2  # type: ignore
 import numpy as np
-from PyQt5 import QtWidgets  # pylint: disable=no-name-in-module
+from PyQt5 import QtCore, QtWidgets  # pylint: disable=no-name-in-module
 
 from align_app.utils.img_io import (
-    SUPPORTED_LOWER,
+    PNG_ENCODE_PARAMS,
+    ensure_dir,
+    list_images,
+    load_cached_preview,
     load_image_bgr,
+    load_image_bgr_scaled,
+    preview_cache_dir,
+    store_cached_preview,
     uniform_preview_scale,
     clamp,
 )
 from .canvas_affine import (
-    affine_lift_small_to_full,
+    affine_params_to_full,
     affine_params_to_small,
+    warp_full,
 )
+from .canvas_params import ImgParams
 from .canvas_perspective import (
     ensure_perspective_quad,
     perspective_with_affine_warp_full,
 )
 
 
+HistDelta = Tuple[Tuple[object, ...], Tuple[object, ...], Tuple[object, ...], float]
+
+# Same-field edits closer together than this collapse into one undo step
+_HIST_COALESCE_S = 0.3
+_HIST_MAX = 200
+
+
+class _PreviewPrefetch(QtCore.QRunnable):
+    """Pool task that loads one preview off the GUI thread."""
+
+    def __init__(self, canvas: "CanvasModelMixin", path: Path, scale: float):
+        super().__init__()
+        self._canvas = canvas
+        self._path = path
+        self._scale = scale
+
+    def run(self) -> None:  # noqa: D401
+        self._canvas._prefetch_one(self._path, self._scale)
+
+
 class CanvasModelMixin:
     """State, params, history, paths, and transform helpers."""
 
@@ -39,7 +71,30 @@ class CanvasModelMixin:
         self.base_full: Optional[np.ndarray] = None
         self.base_prev: Optional[np.ndarray] = None
         self.files: List[Path] = []
-        self.cache_prev: Dict[Path, np.ndarray] = {}
+        # In-memory previews, least recently used first, capped in bytes;
+        # misses fall back to the on-disk cache before decoding the source.
+        self.cache_prev: "OrderedDict[Path, np.ndarray]" = OrderedDict()
+        self.cache_prev_max_bytes: int = 1 << 30
+        self._cache_prev_bytes: int = 0
+        self.preview_cache_dir: Optional[Path] = preview_cache_dir()
+        # cache_prev is also filled by prefetch workers (see prefetch_neighbours)
+        self._cache_lock = threading.Lock()
+        self._prefetching: Set[Path] = set()
+        # Own pool: Qt fans image conversions out on the global pool and blocks
+        # the GUI thread on them; GIL-bound prefetch tasks there can deadlock it.
+        self._prefetch_pool = QtCore.QThreadPool()
+        # Half the cores at most: the GUI and compose threads keep the rest
+        self._prefetch_pool.setMaxThreadCount(max(1, (os.cpu_count() or 2) // 2))
+        # Full-res aligned images as saved, by output path with the file's
+        # mtime_ns; crops from aligned images reuse them instead of decoding
+        # the PNG again. Least recently saved first out, capped in bytes:
+        # a few full-res frames (a 24 MP BGR frame is ~72 MB), since this sits
+        # on top of the preview LRU and is only a crop-after-save shortcut.
+        self._aligned_cache: "OrderedDict[Path, Tuple[int, np.ndarray]]" = (
+            OrderedDict()
+        )
+        self.aligned_cache_max_bytes: int = 256 << 20
+        self._aligned_cache_bytes: int = 0
 
         # Preview scale/size
         self.s: float = 1.0
@@ -49,12 +104,19 @@ class CanvasModelMixin:
         # Per-image params
         # affine: tx,ty,theta,scale
         # perspective: quad in PREVIEW coords (dest points TL,TR,BR,BL)
-        self.params: Dict[Path, Dict[str, object]] = {}
+        self.params: Dict[Path, ImgParams] = {}
         self.idx: int = 0
-
-        # History (per image)
-        self._hist: Dict[Path, List[Dict[str, object]]] = {}
+        # Preview-space affine per image, reused while its params are unchanged
+        self._m_small_cache: Dict[Path, Tuple[tuple, np.ndarray]] = {}
+
+        # History (per image): deltas (fields, old, new, stamp); _hist_idx is
+        # the number of deltas currently applied. A field is an ImgParams
+        # attribute or ("persp", corner) for a single perspective corner; a
+        # corner value of None stands for "no quad yet" (persp is None).
+        self._hist: Dict[Path, List[HistDelta]] = {}
         self._hist_idx: Dict[Path, int] = {}
+        # (path, gesture) of the held key / drag that owns the last delta
+        self._gesture_token: Optional[Tuple[Path, str]] = None
 
         # Perspective editing flag (warp persists even when editing is off)
         self.perspective_editing = False
@@ -73,6 +135,10 @@ class CanvasModelMixin:
         self.overlay_mode = False
         self.show_outline = True
 
+        # Run warps (full-res saves and the right-panel preview) on the GPU via
+        # OpenCL (T-API) when a device exists
+        self.use_opencl = False
+
     # ---- signals hooks (overridden by AlignCanvas) ----
     def _on_mode_changed(self, _is_persp_editing: bool) -> None:
         pass
@@ -93,43 +159,55 @@ class CanvasModelMixin:
         return self.files[self.idx]
 
     # ---- history ----
-    def _clone_state(self, p: Dict[str, object]) -> Dict[str, object]:
-        q = {
-            "tx": float(p.get("tx", 0.0)),
-            "ty": float(p.get("ty", 0.0)),
-            "theta": float(p.get("theta", 0.0)),
-            "scale": float(p.get("scale", 1.0)),
-        }
-        if "persp" in p and isinstance(p["persp"], list) and len(p["persp"]) == 4:
-            q["persp"] = [(float(x), float(y)) for (x, y) in p["persp"]]  # type: ignore[index]
-        return q
-
-    def _ensure_hist_init(self, path: Path) -> None:
-        if path not in self._hist:
-            self._hist[path] = [self._clone_state(self.params[path])]
-            self._hist_idx[path] = 0
-
-    def _push_history(self, path: Path) -> None:
-        self._ensure_hist_init(path)
-        lst = self._hist[path]
-        idx = self._hist_idx[path]
-        if idx < len(lst) - 1:
-            del lst[idx + 1 :]
-        lst.append(self._clone_state(self.params[path]))
-        if len(lst) > 200:
-            lst.pop(0)
-            self._hist_idx[path] = len(lst) - 1
-        else:
-            self._hist_idx[path] = len(lst) - 1
-
-    def _apply_hist_state(self, path: Path, state: Dict[str, object]) -> None:
+    def _push_delta(
+        self,
+        path: Path,
+        fields: Tuple[object, ...],
+        old: Tuple[object, ...],
+        new: Tuple[object, ...],
+        gesture: Optional[str] = None,
+    ) -> None:
+        """Record an applied change of fields from old to new.
+
+        With a ``gesture`` (held key, mouse drag) every delta until the gesture
+        ends (key/mouse release) extends one undo step. Without one, same-field
+        edits within _HIST_COALESCE_S merge.
+        """
+        lst = self._hist.setdefault(path, [])
+        idx = self._hist_idx.get(path, 0)
+        del lst[idx:]
+        now = time.monotonic()
+        token = (path, gesture) if gesture is not None else None
+        if lst and lst[-1][0] == fields:
+            _, last_old, _, stamp = lst[-1]
+            if (
+                token == self._gesture_token
+                if token is not None
+                else now - stamp < _HIST_COALESCE_S
+            ):
+                lst[-1] = (fields, last_old, new, now)
+                return
+        self._gesture_token = token
+        lst.append((fields, old, new, now))
+        if len(lst) > _HIST_MAX:
+            del lst[0]
+        self._hist_idx[path] = len(lst)
+
+    def _apply_delta_values(
+        self, path: Path, fields: Tuple[object, ...], values: Tuple[object, ...]
+    ) -> None:
         p = self.params[path]
-        p["tx"] = float(state.get("tx", 0.0))
-        p["ty"] = float(state.get("ty", 0.0))
-        p["theta"] = float(state.get("theta", 0.0))
-        p["scale"] = float(state.get("scale", 1.0))
-        if "persp" in state:
-            p["persp"] = [(float(x), float(y)) for (x, y) in state["persp"]]  # type: ignore[index]
+        for field, value in zip(fields, values):
+            if isinstance(field, tuple):
+                if value is None:
+                    p.persp = None
+                    continue
+                ensure_perspective_quad(p, self.pw, self.ph)
+                p.persp[field[1]] = value  # type: ignore[index]
+            elif field == "persp":
+                p.persp = list(value) if value is not None else None  # type: ignore[arg-type]
+            else:
+                setattr(p, field, value)
 
     def undo(self) -> None:
         path = self.current_path()
@@ -140,33 +218,40 @@ class CanvasModelMixin:
             return
         idx -= 1
         self._hist_idx[path] = idx
-        self._apply_hist_state(path, self._hist[path][idx])
-        self.update()
+        self._gesture_token = None
+        fields, old, _, _ = self._hist[path][idx]
+        self._apply_delta_values(path, fields, old)
+        self._schedule_update()
 
     def redo(self) -> None:
         path = self.current_path()
         if not path or path not in self._hist:
             return
         idx = self._hist_idx[path]
-        if idx >= len(self._hist[path]) - 1:
+        if idx >= len(self._hist[path]):
             return
-        idx += 1
-        self._hist_idx[path] = idx
-        self._apply_hist_state(path, self._hist[path][idx])
-        self.update()
+        fields, _, new, _ = self._hist[path][idx]
+        self._hist_idx[path] = idx + 1
+        self._gesture_token = None
+        self._apply_delta_values(path, fields, new)
+        self._schedule_update()
 
     def reset_current(self) -> None:
         path = self.current_path()
         if not path:
             return
-        self._push_history(path)
         p = self.params[path]
-        p["tx"] = 0.0
-        p["ty"] = 0.0
-        p["theta"] = 0.0
-        p["scale"] = 1.0
-        if "persp" in p:
-            del p["persp"]
+        fields = ("tx", "ty", "theta", "scale", "persp")
+        old = (
+            p.tx,
+            p.ty,
+            p.theta,
+            p.scale,
+            tuple(p.persp) if p.persp is not None else None,
+        )
+        new = (0.0, 0.0, 0.0, 1.0, None)
+        self._apply_delta_values(path, fields, new)
+        self._push_delta(path, fields, old, new)
         self.update()
 
     # ---- paths / loading ----
@@ -196,6 +281,9 @@ class CanvasModelMixin:
             self.base_prev = cv2.resize(
                 self.base_full, (self.pw, self.ph), interpolation=cv2.INTER_AREA
             )
+            # Shared uncopied by the left panel, the compose thread and the
+            # similarity metrics; any accidental in-place write now raises.
+            self.base_prev.flags.writeable = False
         else:
             self.base_full = None
             self.base_prev = None
@@ -203,48 +291,133 @@ class CanvasModelMixin:
 
         # Files
         if self.src_dir and self.src_dir.is_dir():
-            self.files = sorted(
-                (
-                    p
-                    for p in self.src_dir.rglob("*")
-                    if p.is_file() and p.suffix.lower() in SUPPORTED_LOWER
-                ),
-                key=lambda p: str(p).lower(),
-            )
-            self.params = {
-                p: {"tx": 0.0, "ty": 0.0, "theta": 0.0, "scale": 1.0}
-                for p in self.files
-            }
+            self.files = list_images(self.src_dir)
+            self.params = {p: ImgParams() for p in self.files}
             self.idx = 0
-            self.cache_prev.clear()
+            with self._cache_lock:
+                self.cache_prev.clear()
+                self._cache_prev_bytes = 0
             self._hist.clear()
             self._hist_idx.clear()
+            self._m_small_cache.clear()
+            self._aligned_cache.clear()
+            self._aligned_cache_bytes = 0
 
+        self._invalidate_view_caches()
         self.update()
+        self.prefetch_neighbours()
 
     # ---- preview cache ----
-    def _get_preview(self, path: Path) -> np.ndarray:
-        if path in self.cache_prev:
-            return self.cache_prev[path]
-        full = load_image_bgr(str(path))
-        prev = cv2.resize(
-            full,
-            (int(round(full.shape[1] * self.s)), int(round(full.shape[0] * self.s))),
-            interpolation=cv2.INTER_AREA,
-        )
-        self.cache_prev[path] = prev
+    def _load_preview(self, path: Path, scale: float) -> np.ndarray:
+        """Decode + resize path at scale (or read it from disk); touches no state."""
+        cache_dir = self.preview_cache_dir
+        prev = load_cached_preview(cache_dir, path, scale) if cache_dir else None
+        if prev is None:
+            prev = load_image_bgr_scaled(str(path), scale)
+            if cache_dir:
+                store_cached_preview(cache_dir, path, scale, prev)
+        return prev
+
+    def _cache_preview(self, path: Path, prev: np.ndarray) -> np.ndarray:
+        """Insert prev unless path is already cached; returns the cached array."""
+        with self._cache_lock:
+            if path in self.cache_prev:
+                self.cache_prev.move_to_end(path)
+                return self.cache_prev[path]
+            self.cache_prev[path] = prev
+            self._cache_prev_bytes += prev.nbytes
+            # Evict least recently used previews, always keeping the newest one
+            while (
+                self._cache_prev_bytes > self.cache_prev_max_bytes
+                and len(self.cache_prev) > 1
+            ):
+                _, old = self.cache_prev.popitem(last=False)
+                self._cache_prev_bytes -= old.nbytes
         return prev
 
+    def _get_preview(self, path: Path) -> np.ndarray:
+        with self._cache_lock:
+            if path in self.cache_prev:
+                self.cache_prev.move_to_end(path)
+                return self.cache_prev[path]
+        return self._cache_preview(path, self._load_preview(path, self.s))
+
+    def _remember_aligned(self, out_path: Path, img: np.ndarray) -> None:
+        old = self._aligned_cache.pop(out_path, None)
+        if old is not None:
+            self._aligned_cache_bytes -= old[1].nbytes
+        try:
+            mtime = out_path.stat().st_mtime_ns
+        except OSError:
+            return
+        if img.nbytes > self.aligned_cache_max_bytes:
+            return
+        self._aligned_cache[out_path] = (mtime, img)
+        self._aligned_cache_bytes += img.nbytes
+        while self._aligned_cache_bytes > self.aligned_cache_max_bytes:
+            _, (_, evicted) = self._aligned_cache.popitem(last=False)
+            self._aligned_cache_bytes -= evicted.nbytes
+
+    def cached_aligned(self, out_path: Path) -> Optional[np.ndarray]:
+        """The image saved to out_path, if that file is unchanged since; else None.
+
+        Read-only lookup (no LRU reordering), safe from crop worker threads.
+        """
+        hit = self._aligned_cache.get(out_path)
+        if hit is None:
+            return None
+        try:
+            if out_path.stat().st_mtime_ns == hit[0]:
+                return hit[1]
+        except OSError:
+            pass
+        return None
+
+    def prefetch_neighbours(self, radius: int = 2) -> None:
+        """Load previews around the current index in the background."""
+        if not self.files or not self.have_base():
+            return
+        # Nearest first, forward before backward: idx+1, idx-1, idx+2, ...
+        # The current image is not queued: the paint path loads it right away
+        # and a pool job would only decode the same file a second time.
+        order: List[int] = []
+        for d in range(1, radius + 1):
+            order += [self.idx + d, self.idx - d]
+        for i in order:
+            if not 0 <= i < len(self.files):
+                continue
+            path = self.files[i]
+            with self._cache_lock:
+                if path in self.cache_prev or path in self._prefetching:
+                    continue
+                self._prefetching.add(path)
+            self._prefetch_pool.start(_PreviewPrefetch(self, path, self.s))
+
+    def _prefetch_one(self, path: Path, scale: float) -> None:
+        """Worker body: no Qt objects are touched here, only cache_prev."""
+        try:
+            prev = self._load_preview(path, scale)
+        except (RuntimeError, OSError, cv2.error):
+            prev = None  # the paint path will surface the error on demand
+        finally:
+            with self._cache_lock:
+                self._prefetching.discard(path)
+        # Drop results made for a base that has since been replaced
+        if prev is not None and scale == self.s and path in self.params:
+            self._cache_preview(path, prev)
+
     # ---- navigation ----
     def next_image(self) -> None:
         if self.files and self.idx < len(self.files) - 1:
             self.idx += 1
             self.update()
+            self.prefetch_neighbours()
 
     def prev_image(self) -> None:
         if self.files and self.idx > 0:
             self.idx -= 1
             self.update()
+            self.prefetch_neighbours()
 
     # ---- perspective / affine helpers ----
     def _is_default_quad(self, quad) -> bool:
@@ -256,18 +429,31 @@ class CanvasModelMixin:
         ]
         if len(quad) != 4:
             return True
+        # Plain scalar compare: for 8 floats this is ~1 us, while
+        # np.asarray + np.allclose costs 6-25 us of array setup per call.
         eps = 1e-3
         for (x1, y1), (x2, y2) in zip(quad, default):
             if abs(x1 - x2) > eps or abs(y1 - y2) > eps:
                 return False
         return True
 
-    def _has_active_perspective(self, p: Dict[str, object]) -> bool:
-        return (
-            "persp" in p
-            and isinstance(p["persp"], list)
-            and not self._is_default_quad(p["persp"])
-        )
+    def _has_active_perspective(self, p: ImgParams) -> bool:
+        return p.persp is not None and not self._is_default_quad(p.persp)
+
+    def _affine_small(self, path: Path, mov_prev: np.ndarray) -> np.ndarray:
+        """affine_params_to_small for path, cached until its params change.
+
+        The returned matrix is shared (compose jobs hold on to it) and read-only.
+        """
+        p = self.params[path]
+        sig = (p.tx, p.ty, p.theta, p.scale, mov_prev.shape[:2])
+        hit = self._m_small_cache.get(path)
+        if hit is not None and hit[0] == sig:
+            return hit[1]
+        m_small = affine_params_to_small(mov_prev, p)
+        m_small.flags.writeable = False
+        self._m_small_cache[path] = (sig, m_small)
+        return m_small
 
     def set_perspective_editing(self, enabled: bool) -> None:
         enabled = bool(enabled)
@@ -279,16 +465,15 @@ class CanvasModelMixin:
             if path:
                 p = self.params[path]
                 ensure_perspective_quad(p, self.pw, self.ph)
-                quad = p["persp"]  # type: ignore[index]
-                if self._is_default_quad(quad):
+                if self._is_default_quad(p.persp):
                     mov_prev = self._get_preview(path)
-                    m_small = affine_params_to_small(mov_prev, p)
+                    m_small = self._affine_small(path, mov_prev)
                     h, w = mov_prev.shape[:2]
                     corners = np.float32(
                         [[0, 0], [w - 1, 0], [w - 1, h - 1], [0, h - 1]]
                     ).reshape(-1, 1, 2)
                     tc = cv2.transform(corners, m_small).reshape(-1, 2)
-                    p["persp"] = [(float(x), float(y)) for (x, y) in tc]
+                    p.persp = [(float(x), float(y)) for (x, y) in tc]
         self._on_mode_changed(self.perspective_editing)
         self.update()
 
@@ -303,53 +488,57 @@ class CanvasModelMixin:
             self._on_active_corner_changed(self.active_corner)
             self.update()
 
-    def move_dxdy(self, dx: float, dy: float) -> None:
+    def move_dxdy(self, dx: float, dy: float, gesture: Optional[str] = None) -> None:
         if not self.have_files():
             return
         path = self.current_path()
         if not path:
             return
-        self._push_history(path)
         p = self.params[path]
-        p["tx"] = float(p.get("tx", 0.0)) + float(dx)  # type: ignore[index]
-        p["ty"] = float(p.get("ty", 0.0)) + float(dy)  # type: ignore[index]
-        self.update()
+        old = (p.tx, p.ty)
+        p.tx += float(dx)
+        p.ty += float(dy)
+        self._push_delta(path, ("tx", "ty"), old, (p.tx, p.ty), gesture)
+        self._schedule_update()
 
-    def rotate_deg(self, dtheta: float) -> None:
+    def rotate_deg(self, dtheta: float, gesture: Optional[str] = None) -> None:
         if not self.have_files():
             return
         path = self.current_path()
         if not path:
             return
-        self._push_history(path)
         p = self.params[path]
-        p["theta"] = float(p.get("theta", 0.0)) + float(dtheta)  # type: ignore[index]
-        self.update()
+        old = p.theta
+        p.theta += float(dtheta)
+        self._push_delta(path, ("theta",), (old,), (p.theta,), gesture)
+        self._schedule_update()
 
-    def zoom_factor(self, factor: float) -> None:
+    def zoom_factor(self, factor: float, gesture: Optional[str] = None) -> None:
         if not self.have_files():
             return
         path = self.current_path()
         if not path:
             return
-        self._push_history(path)
         p = self.params[path]
-        cur = float(p.get("scale", 1.0))  # type: ignore[index]
-        p["scale"] = clamp(cur * float(factor), 0.8, 1.2)  # type: ignore[index]
-        self.update()
+        cur = p.scale
+        p.scale = clamp(cur * float(factor), 0.8, 1.2)
+        self._push_delta(path, ("scale",), (cur,), (p.scale,), gesture)
+        self._schedule_update()
 
-    def nudge_corner(self, dx: float, dy: float) -> None:
+    def nudge_corner(self, dx: float, dy: float, gesture: Optional[str] = None) -> None:
         path = self.current_path()
         if not path:
             return
         p = self.params[path]
+        unset = p.persp is None
         ensure_perspective_quad(p, self.pw, self.ph)
-        quad = p["persp"]  # type: ignore[index]
-        self._push_history(path)
-        x, y = quad[self.active_corner]
-        quad[self.active_corner] = (x + dx, y + dy)
-        p["persp"] = quad  # type: ignore[index]
-        self.update()
+        quad = p.persp
+        corner = self.active_corner
+        x, y = quad[corner]
+        quad[corner] = (x + dx, y + dy)
+        old = None if unset else (x, y)  # undo back to no quad at all
+        self._push_delta(path, (("persp", corner),), (old,), (quad[corner],), gesture)
+        self._schedule_update()
 
     # ---- saving aligned output ----
     def save_current_aligned(self) -> None:
@@ -358,7 +547,7 @@ class CanvasModelMixin:
                 self, "Missing path", "Please set Align Out folder in the toolbar."
             )
             return
-        self.align_out.mkdir(parents=True, exist_ok=True)
+        ensure_dir(self.align_out)
         path = self.current_path()
         if not path:
             return
@@ -367,28 +556,22 @@ class CanvasModelMixin:
 
         mov_prev = self._get_preview(path)
         p = self.params[path]
-        m_small = affine_params_to_small(mov_prev, p)  # type: ignore[arg-type]
-        m_full = affine_lift_small_to_full(self.s, m_small)
+        m_full = affine_params_to_full(mov_prev.shape, p, self.s)
 
         if self._has_active_perspective(p):
             out = perspective_with_affine_warp_full(
                 img_full=img_full,
                 base_w=bw,
                 base_h=bh,
-                dest_quad_prev=p["persp"],  # type: ignore[index]
+                dest_quad_prev=p.persp,  # type: ignore[arg-type]
                 preview_scale=self.s,
                 m_full=m_full,
+                use_opencl=self.use_opencl,
             )
         else:
-            out = cv2.warpAffine(
-                img_full,
-                m_full,
-                (bw, bh),
-                flags=cv2.INTER_LINEAR,
-                borderMode=cv2.BORDER_CONSTANT,
-                borderValue=(0, 0, 0),
-            )
+            out = warp_full(img_full, m_full, (bw, bh), use_opencl=self.use_opencl)
 
         out_path = self.align_out / f"{path.stem}.png"
-        cv2.imwrite(str(out_path), out)
+        if cv2.imwrite(str(out_path), out, PNG_ENCODE_PARAMS):
+            self._remember_aligned(out_path, out)
         QtWidgets.QMessageBox.information(self, "Saved", f"Aligned -> {out_path}")
@@ -0,0 +1,41 @@
+"""Per-image alignment parameters."""
+
+from __future__ import annotations
+
+from typing import List, Optional, Tuple
+
+
+class ImgParams:
+    """Affine (tx, ty, theta, scale) and optional perspective quad of one image.
+
+    ``persp`` is the destination quad TL,TR,BR,BL in PREVIEW coords, or None
+    when no perspective was set. Slots keep attribute reads/writes cheap on
+    the keyboard/drag paths, which touch these on every event.
+    """
+
+    __slots__ = ("tx", "ty", "theta", "scale", "persp")
+
+    def __init__(
+        self,
+        tx: float = 0.0,
+        ty: float = 0.0,
+        theta: float = 0.0,
+        scale: float = 1.0,
+        persp: Optional[List[Tuple[float, float]]] = None,
+    ) -> None:
+        self.tx = tx
+        self.ty = ty
+        self.theta = theta
+        self.scale = scale
+        self.persp = persp
+
+    def copy(self) -> "ImgParams":
+        """Independent copy (the quad list is copied too)."""
+        persp = list(self.persp) if self.persp is not None else None
+        return ImgParams(self.tx, self.ty, self.theta, self.scale, persp)
+
+    def __repr__(self) -> str:
+        return (
+            f"ImgParams(tx={self.tx!r}, ty={self.ty!r}, theta={self.theta!r}, "
+            f"scale={self.scale!r}, persp={self.persp!r})"
+        )
@@ -9,25 +9,24 @@ Includes helpers to:
 
 from __future__ import annotations
 
-from typing import Dict, List, Tuple
+from typing import List, Optional, Tuple
 
 # pylint: disable=no-member
 import cv2  # type: ignore
 import numpy as np
 
+from .canvas_affine import _compose_target, transform_corners, warp_full
+from .canvas_params import ImgParams
+
 Point = Tuple[float, float]
 Quad = List[Point]
 
 
-def ensure_perspective_quad(params: Dict[str, object], pw: int, ph: int) -> None:
-    """Ensure params['persp'] exists (as preview-dest quad TL,TR,BR,BL)."""
-    if (
-        "persp" in params
-        and isinstance(params["persp"], list)
-        and len(params["persp"]) == 4
-    ):
+def ensure_perspective_quad(params: ImgParams, pw: int, ph: int) -> None:
+    """Ensure params.persp exists (as preview-dest quad TL,TR,BR,BL)."""
+    if params.persp is not None and len(params.persp) == 4:
         return
-    params["persp"] = [
+    params.persp = [
         (0.0, 0.0),
         (pw - 1.0, 0.0),
         (pw - 1.0, ph - 1.0),
@@ -35,12 +34,6 @@ def ensure_perspective_quad(params: Dict[str, object], pw: int, ph: int) -> None
     ]
 
 
-def _overlay(base: np.ndarray, warped: np.ndarray, alpha: float) -> np.ndarray:
-    mask = (warped > 0).any(axis=2).astype(np.uint8) * 255
-    mask3 = cv2.cvtColor(mask, cv2.COLOR_GRAY2BGR)
-    return np.where(mask3 > 0, cv2.addWeighted(base, 1 - alpha, warped, alpha, 0), base)
-
-
 def _outline(img: np.ndarray, quad: Quad) -> None:
     """Draw outline of the destination quad and larger (easier) grab handles."""
     pts = np.array(quad, dtype=np.int32).reshape(-1, 1, 2)
@@ -57,6 +50,9 @@ def perspective_compose_preview(
     overlay: bool,
     alpha: float,
     outline: bool,
+    flags: int = cv2.INTER_LINEAR,
+    dst: Optional[np.ndarray] = None,
+    blend_dst: Optional[np.ndarray] = None,
 ) -> np.ndarray:
     """Warp mov_prev with perspective into base_prev dims using preview quad."""
     ph, pw = base_prev.shape[:2]
@@ -68,24 +64,34 @@ def perspective_compose_preview(
             [0, mov_prev.shape[0] - 1],
         ]
     )
-    dst = np.float32(dest_quad)
-    h_mat = cv2.getPerspectiveTransform(src, dst)
+    quad_dst = np.float32(dest_quad)
+    h_mat = cv2.getPerspectiveTransform(src, quad_dst)
     warped = cv2.warpPerspective(
         mov_prev,
         h_mat,
         (pw, ph),
-        flags=cv2.INTER_LINEAR,
+        dst=dst,
+        flags=flags,
         borderMode=cv2.BORDER_CONSTANT,
         borderValue=(0, 0, 0),
     )
-    out = warped
-    if overlay:
-        out = _overlay(base_prev.copy(), warped, alpha)
+    out = _compose_target(base_prev, warped, overlay, alpha, outline, blend_dst)
     if outline:
         _outline(out, dest_quad)
     return out
 
 
+def preview_homography(
+    mov_prev: np.ndarray, dest_quad: Quad, m_small: np.ndarray
+) -> np.ndarray:
+    """3x3 preview warp: the affined source corners mapped onto dest_quad."""
+    # Corners of the moving image in source space, moved by the affine
+    h, w = mov_prev.shape[:2]
+    src_affined = transform_corners(w, h, m_small)
+    quad_dst = np.float32(dest_quad)
+    return cv2.getPerspectiveTransform(np.float32(src_affined), quad_dst)
+
+
 def perspective_with_affine_compose_preview(
     base_prev: np.ndarray,
     mov_prev: np.ndarray,
@@ -94,39 +100,40 @@ def perspective_with_affine_compose_preview(
     overlay: bool,
     alpha: float,
     outline: bool,
+    flags: int = cv2.INTER_LINEAR,
+    dst: Optional[np.ndarray] = None,
+    blend_dst: Optional[np.ndarray] = None,
+    warped: Optional[np.ndarray] = None,
+    h_mat: Optional[np.ndarray] = None,
 ) -> np.ndarray:
     """Compose with BOTH affine (m_small) and perspective (dest_quad), in preview space.
 
     We compose by transforming the *source corners* with the affine, then solving a
     perspective that maps those affined corners to the destination quad.
+    ``warped`` is a previous warp for the same inputs; when given it is reused.
+    ``h_mat`` overrides that solved warp (e.g. with a display scale folded in);
+    ``dest_quad`` must then be in the same output space, as it is only drawn.
     """
     ph, pw = base_prev.shape[:2]
-
-    # Corners of the moving image in source space
-    h, w = mov_prev.shape[:2]
-    corners = np.float32([[0, 0], [w - 1, 0], [w - 1, h - 1], [0, h - 1]]).reshape(
-        -1, 1, 2
-    )
-
-    # Lift 2x3 affine to 3x3 and transform corners
-    m3 = np.vstack([m_small, [0, 0, 1]]).astype(np.float32)
-    src_affined = cv2.perspectiveTransform(corners, m3).reshape(-1, 2)
-
-    dst = np.float32(dest_quad)
-    h_mat = cv2.getPerspectiveTransform(np.float32(src_affined), dst)
-
+    if warped is not None:
+        out = _compose_target(base_prev, warped, overlay, alpha, outline, blend_dst)
+        if outline:
+            _outline(out, dest_quad)
+        return out
+
+    if h_mat is None:
+        h_mat = preview_homography(mov_prev, dest_quad, m_small)
     warped = cv2.warpPerspective(
         mov_prev,
         h_mat,
         (pw, ph),
-        flags=cv2.INTER_LINEAR,
+        dst=dst,
+        flags=flags,
         borderMode=cv2.BORDER_CONSTANT,
         borderValue=(0, 0, 0),
     )
 
-    out = warped
-    if overlay:
-        out = _overlay(base_prev.copy(), warped, alpha)
+    out = _compose_target(base_prev, warped, overlay, alpha, outline, blend_dst)
     if outline:
         _outline(out, dest_quad)
     return out
@@ -138,6 +145,7 @@ def perspective_warp_full(
     base_h: int,
     dest_quad_prev: Quad,
     preview_scale: float,
+    use_opencl: bool = False,
 ) -> np.ndarray:
     """Warp full-res moving image using a PREVIEW quad scaled up to full-res."""
     src = np.float32(
@@ -153,15 +161,7 @@ def perspective_warp_full(
         [(x / preview_scale, y / preview_scale) for (x, y) in dest_quad_prev]
     )
     h_mat = cv2.getPerspectiveTransform(src, dst)
-    out = cv2.warpPerspective(
-        img_full,
-        h_mat,
-        (base_w, base_h),
-        flags=cv2.INTER_LINEAR,
-        borderMode=cv2.BORDER_CONSTANT,
-        borderValue=(0, 0, 0),
-    )
-    return out
+    return warp_full(img_full, h_mat, (base_w, base_h), use_opencl=use_opencl)
 
 
 def perspective_with_affine_warp_full(
@@ -171,6 +171,7 @@ def perspective_with_affine_warp_full(
     dest_quad_prev: Quad,
     preview_scale: float,
     m_full: np.ndarray,
+    use_opencl: bool = False,
 ) -> np.ndarray:
     """Full-res save with BOTH affine (m_full) and perspective (dest_quad_prev).
 
@@ -191,13 +192,4 @@ def perspective_with_affine_warp_full(
         [(x / preview_scale, y / preview_scale) for (x, y) in dest_quad_prev]
     )
     h_mat = cv2.getPerspectiveTransform(np.float32(src_affined), dst_full)
-
-    out = cv2.warpPerspective(
-        img_full,
-        h_mat,
-        (base_w, base_h),
-        flags=cv2.INTER_LINEAR,
-        borderMode=cv2.BORDER_CONSTANT,
-        borderValue=(0, 0, 0),
-    )
-    return out
+    return warp_full(img_full, h_mat, (base_w, base_h), use_opencl=use_opencl)
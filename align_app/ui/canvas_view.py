@@ -1,17 +1,16 @@
 from __future__ import annotations
 
+import threading
 from typing import Optional, Tuple
 
 # pylint: disable=no-member
 import cv2  # type: ignore
-from PyQt5 import QtCore, QtGui  # pylint: disable=no-name-in-module
+from PyQt5 import QtCore, QtGui, QtWidgets  # pylint: disable=no-name-in-module
 
 from align_app.utils.img_io import bgr_to_qimage, clamp
-from .canvas_affine import affine_params_to_small, affine_compose_preview
-from .canvas_perspective import (
-    ensure_perspective_quad,
-    perspective_with_affine_compose_preview,
-)
+from . import _compose_numba
+from .canvas_compose import ComposeJob, ComposeWorker, PanelComposer
+from .canvas_perspective import ensure_perspective_quad
 
 
 class CanvasViewMixin:
@@ -48,13 +47,138 @@ class CanvasViewMixin:
         self._drag_start_point: Optional[QtCore.QPoint] = None
         self.drag_last: Optional[QtCore.QPoint] = None
 
+        # Warp interpolation: INTER_NEAREST while dragging, INTER_LINEAR at rest
+        self._live_flags: int = cv2.INTER_LINEAR
+
+        # Scaled panel images, reused while their render inputs are unchanged.
+        # They are Qt-owned Format_RGB32, which the raster engine draws as is,
+        # so they are painted with drawImage and never copied into a QPixmap.
+        self._left_img: Optional[QtGui.QImage] = None
+        self._left_img_key: Optional[tuple] = None
+        self._right_img: Optional[QtGui.QImage] = None
+        self._right_img_key: Optional[tuple] = None
+
+        # Right-panel compose runs on a worker thread; paintEvent keeps showing
+        # the last render of the same image until the new one arrives. A
+        # different image or content size is composed synchronously instead.
+        self.async_compose: bool = True
+        self._composer = PanelComposer()
+        self._compose_pending: Optional[tuple] = None
+        self._compose_thread = QtCore.QThread()
+        self._compose_worker = ComposeWorker()
+        self._compose_worker.moveToThread(self._compose_thread)
+        self._compose_worker.ready.connect(self._on_compose_ready)
+        self._compose_thread.start()
+        # JIT the optional overlay kernel in the background; compose uses the
+        # NumPy path until it is ready
+        threading.Thread(
+            target=_compose_numba.warm_up, name="overlay-jit", daemon=True
+        ).start()
+        app = QtWidgets.QApplication.instance()
+        if app is not None:
+            app.aboutToQuit.connect(self.stop_compose_thread)
+
+        # Inputs of the last _compute_draw_scale; pans and repaints reuse it
+        self._ds_key: Optional[tuple] = None
+
+        # Recorded grid lattice, rebuilt only when the step or frame size changes
+        self._grid_pic: Optional[QtGui.QPicture] = None
+        self._grid_key: Optional[tuple] = None
+
+        # Coalesce bursts of state changes into at most one repaint per frame
+        self._redraw_timer = QtCore.QTimer(self)
+        self._redraw_timer.setSingleShot(True)
+        self._redraw_timer.setInterval(16)
+        self._redraw_timer.timeout.connect(self._flush_update)
+        # Area for the pending repaint; _redraw_full means the whole widget
+        self._redraw_region = QtGui.QRegion()
+        self._redraw_full = False
+
+    def _schedule_update(self, region: Optional[QtGui.QRegion] = None) -> None:
+        """Request a repaint within ~16 ms; requests meanwhile are merged into it.
+
+        ``region`` limits the repaint to part of the widget (e.g. the right
+        panel during a drag); None repaints everything.
+        """
+        if region is None:
+            self._redraw_full = True
+        elif not self._redraw_full:
+            self._redraw_region = self._redraw_region.united(region)
+        if not self._redraw_timer.isActive():
+            self._redraw_timer.start()
+
+    def _flush_update(self) -> None:
+        region, full = self._redraw_region, self._redraw_full
+        self._redraw_region, self._redraw_full = QtGui.QRegion(), False
+        if full:
+            self.update()
+        else:
+            self.update(region)
+
+    def _right_panel_region(self) -> QtGui.QRegion:
+        """Widget area of the right panel (all of it before the first layout)."""
+        if self.right_rect.isEmpty():
+            return QtGui.QRegion(self.rect())
+        return QtGui.QRegion(self.right_rect)
+
+    def _hover_region(
+        self, cell: Optional[Tuple[int, int, int, int]]
+    ) -> QtGui.QRegion:
+        """Widget area of the hover highlight for cell on both panels."""
+        region = QtGui.QRegion()
+        if cell is None or not self.grid_on:
+            return region
+        x0, y0, x1, y1 = cell
+        for frame in (self.left_rect, self.right_rect):
+            rect = QtCore.QRect(frame.x() + x0, frame.y() + y0, x1 - x0, y1 - y0)
+            region = region.united(rect.adjusted(-2, -2, 2, 2))  # 2 px pen
+        return region
+
+    def _invalidate_view_caches(self) -> None:
+        """Drop cached render state (called when images/paths change)."""
+        self._composer.invalidate()
+        self._compose_worker.invalidate()
+        self._compose_pending = None
+        self._left_img_key = None
+        self._right_img = None
+        self._right_img_key = None
+        self._grid_key = None
+
+    def stop_compose_thread(self) -> None:
+        """Finish the compose worker thread (on application quit)."""
+        self._compose_thread.quit()
+        self._compose_thread.wait()
+
+    def _on_compose_ready(self, key: tuple, img: QtGui.QImage) -> None:
+        if self._compose_pending is None:
+            return  # caches were invalidated while this job was running
+        self._right_img = img
+        self._right_img_key = key
+        if key == self._compose_pending:
+            self._compose_pending = None
+        self.update()
+
+    def _display_interp(self) -> int:
+        """Interpolation for the preview -> screen resize of both panels.
+
+        INTER_AREA only pays off for strong reductions; from 0.5x upwards
+        bilinear looks the same on screen and is several times cheaper.
+        """
+        return cv2.INTER_AREA if self.scale_draw < 0.5 else cv2.INTER_LINEAR
+
     def _compute_draw_scale(self) -> None:
         """Compute frame fit scale ds, frame size (tw, th), and content scale."""
         if not self.have_base():
             self.ds = 1.0
             self.scale_draw = 1.0
             self.tw = self.th = 0
+            self._ds_key = None
+            return
+
+        ds_key = (self.width(), self.height(), self.pw, self.ph, self.view_zoom)
+        if ds_key == self._ds_key:
             return
+        self._ds_key = ds_key
 
         avail_w = max(1, self.width())
         avail_h = max(1, self.height())
@@ -84,9 +208,12 @@ class CanvasViewMixin:
         self.update()
 
     # ---- painting ----
-    def paintEvent(self, _evt: QtGui.QPaintEvent) -> None:  # noqa: N802
+    def paintEvent(self, evt: QtGui.QPaintEvent) -> None:  # noqa: N802
+        # Painting is clipped to the dirty region; a panel outside it is not
+        # re-scaled, composed or drawn at all.
+        dirty = evt.region()
         p = QtGui.QPainter(self)
-        p.fillRect(self.rect(), QtGui.QColor(20, 20, 20))
+        p.fillRect(evt.rect(), QtGui.QColor(20, 20, 20))
 
         if not self.have_base():
             p.setPen(QtGui.QColor(220, 220, 220))
@@ -106,6 +233,8 @@ class CanvasViewMixin:
         frame_right = QtCore.QRect(self.tw + gap, 0, self.tw, self.th)
         self.left_rect = frame_left
         self.right_rect = frame_right
+        left_vis = dirty.intersects(frame_left)
+        right_vis = dirty.intersects(frame_right)
 
         # Pan offsets in DRAW pixels (content shift), top-left anchored
         ox = int(round(self.view_pan_xp * self.scale_draw))
@@ -115,100 +244,154 @@ class CanvasViewMixin:
         w_img = int(round(self.pw * self.scale_draw))
         h_img = int(round(self.ph * self.scale_draw))
 
-        # Base (left content)
-        left_bgr = self.base_prev.copy() if self.base_prev is not None else None
-        if left_bgr is None:
-            p.end()
-            return
-        if w_img > 0 and h_img > 0:
-            left_bgr = cv2.resize(
-                left_bgr, (w_img, h_img), interpolation=cv2.INTER_AREA
-            )
-        left_pix = QtGui.QPixmap.fromImage(bgr_to_qimage(left_bgr))
+        # Base (left content): only re-scaled when the base or zoom changes;
+        # at 1:1 the preview is converted as is
+        left_key = (id(self.base_prev), w_img, h_img)
+        if left_vis and left_key != self._left_img_key:
+            left_bgr = self.base_prev
+            if w_img > 0 and h_img > 0 and (w_img, h_img) != (self.pw, self.ph):
+                left_bgr = cv2.resize(
+                    left_bgr, (w_img, h_img), interpolation=self._display_interp()
+                )
+            self._left_img = bgr_to_qimage(left_bgr)
+            self._left_img_key = left_key
+        left_img = self._left_img
 
         # Moving (right content)
-        right_pix = None
-        if self.have_files():
+        right_img = None
+        if right_vis and self.have_files():
             path = self.current_path()
             mov_prev = self._get_preview(path) if path else None
             if mov_prev is not None:
                 params = self.params[path]  # type: ignore[index]
-                m_small = affine_params_to_small(mov_prev, params)  # type: ignore[arg-type]
-
-                use_persp = (
-                    "persp" in params
-                    and isinstance(params["persp"], list)
-                    and not self._is_default_quad(params["persp"])
-                )
+                m_small = self._affine_small(path, mov_prev)
 
+                use_persp = self._has_active_perspective(params)
                 if use_persp:
                     ensure_perspective_quad(params, self.pw, self.ph)
-                    right_bgr = perspective_with_affine_compose_preview(
-                        base_prev=self.base_prev,
-                        mov_prev=mov_prev,
-                        dest_quad=params["persp"],  # type: ignore[index]
-                        m_small=m_small,
-                        overlay=self.overlay_mode,
-                        alpha=self.alpha,
-                        outline=self.show_outline,
-                    )
-                else:
-                    right_bgr = affine_compose_preview(
+                quad = tuple(params.persp) if use_persp else None
+                warp_key = (
+                    path,
+                    id(mov_prev),
+                    self.base_prev.shape,
+                    self._live_flags,
+                    m_small.tobytes(),
+                    quad,
+                )
+                right_key = (
+                    warp_key,
+                    self.overlay_mode,
+                    self.alpha,
+                    self.show_outline,
+                    w_img,
+                    h_img,
+                )
+                if right_key != self._right_img_key:
+                    # Mid-drag the display resize is as coarse as the warp (the
+                    # key changes with _live_flags, so release re-renders);
+                    # a non-AREA filter also lets the composer fuse the two.
+                    if self._live_flags == cv2.INTER_NEAREST:
+                        resize_flags = cv2.INTER_NEAREST
+                    else:
+                        resize_flags = self._display_interp()
+                    job = ComposeJob(
+                        key=right_key,
+                        warp_key=warp_key,
                         base_prev=self.base_prev,
                         mov_prev=mov_prev,
                         m_small=m_small,
+                        dest_quad=list(quad) if quad is not None else None,
                         overlay=self.overlay_mode,
                         alpha=self.alpha,
                         outline=self.show_outline,
+                        flags=self._live_flags,
+                        size=(w_img, h_img),
+                        resize_flags=resize_flags,
+                        use_opencl=self.use_opencl,
                     )
-
-                if w_img > 0 and h_img > 0:
-                    right_bgr = cv2.resize(
-                        right_bgr, (w_img, h_img), interpolation=cv2.INTER_AREA
+                    prev_key = self._right_img_key
+                    can_wait = (
+                        self.async_compose
+                        and self._right_img is not None
+                        and prev_key is not None
+                        and prev_key[0][0] == path
+                        and prev_key[4:] == (w_img, h_img)
                     )
-                right_pix = QtGui.QPixmap.fromImage(bgr_to_qimage(right_bgr))
+                    if can_wait:
+                        if right_key != self._compose_pending:
+                            self._compose_pending = right_key
+                            self._compose_worker.submit(job)
+                    else:
+                        self._right_img = self._composer.render(job)
+                        self._right_img_key = right_key
+                right_img = self._right_img
 
         # Content origins (top-left of the scaled images) inside the widget
         left_img_pos = QtCore.QPoint(frame_left.x() - ox, frame_left.y() - oy)
         right_img_pos = QtCore.QPoint(frame_right.x() - ox, frame_right.y() - oy)
 
         # Draw with clipping to keep images inside frames
-        p.save()
-        p.setClipRect(frame_left)
-        p.drawPixmap(left_img_pos, left_pix)
-        p.restore()
-
-        p.save()
-        p.setClipRect(frame_right)
-        if right_pix is not None:
-            p.drawPixmap(right_img_pos, right_pix)
-        else:
-            p.fillRect(frame_right, QtGui.QColor(40, 40, 40))
-            p.setPen(QtGui.QColor(200, 200, 200))
-            p.drawText(frame_right, QtCore.Qt.AlignCenter, "Pick a Source directory")
-        p.restore()
+        if left_vis:
+            p.save()
+            p.setClipRect(frame_left)
+            p.drawImage(left_img_pos, left_img)
+            p.restore()
+
+        if right_vis:
+            p.save()
+            p.setClipRect(frame_right)
+            if right_img is not None:
+                p.drawImage(right_img_pos, right_img)
+            else:
+                p.fillRect(frame_right, QtGui.QColor(40, 40, 40))
+                p.setPen(QtGui.QColor(200, 200, 200))
+                p.drawText(
+                    frame_right, QtCore.Qt.AlignCenter, "Pick a Source directory"
+                )
+            p.restore()
 
         # Grid (pans/zooms with content)
         if self.grid_on:
             step_draw = max(1, int(round(self.grid_step * self.scale_draw)))
-            pen = QtGui.QPen(QtGui.QColor(128, 128, 128), 1, QtCore.Qt.SolidLine)
-            p.setPen(pen)
 
-            def draw_grid(frame: QtCore.QRect, origin: QtCore.QPoint) -> None:
+            # One recorded lattice, one step larger than the biggest frame, is
+            # replayed per panel at the pan phase: panning needs no rebuild and
+            # no per-frame conversion of Python line lists.
+            gw = max(frame_left.width(), frame_right.width()) + step_draw
+            gh = max(frame_left.height(), frame_right.height()) + step_draw
+            grid_key = (step_draw, gw, gh)
+            if grid_key != self._grid_key:
+                pic = QtGui.QPicture()
+                gp = QtGui.QPainter(pic)
+                gp.setPen(
+                    QtGui.QPen(QtGui.QColor(128, 128, 128), 1, QtCore.Qt.SolidLine)
+                )
+                xs = range(0, gw + 1, step_draw)
+                ys = range(0, gh + 1, step_draw)
+                lines = [QtCore.QLine(x, 0, x, gh) for x in xs]
+                lines += [QtCore.QLine(0, y, gw, y) for y in ys]
+                gp.drawLines(lines)
+                gp.end()
+                self._grid_pic = pic
+                self._grid_key = grid_key
+
+            for frame, origin, visible in (
+                (frame_left, left_img_pos, left_vis),
+                (frame_right, right_img_pos, right_vis),
+            ):
+                if not visible:
+                    continue
                 # origin = where the (0,0) of the preview sits in draw pixels
                 phase_x = (-origin.x()) % step_draw
                 phase_y = (-origin.y()) % step_draw
-                x = frame.left() + phase_x
-                while x <= frame.right():
-                    p.drawLine(x, frame.top(), x, frame.bottom())
-                    x += step_draw
-                y = frame.top() + phase_y
-                while y <= frame.bottom():
-                    p.drawLine(frame.left(), y, frame.right(), y)
-                    y += step_draw
-
-            draw_grid(frame_left, left_img_pos)
-            draw_grid(frame_right, right_img_pos)
+                p.save()
+                p.setClipRect(frame)
+                p.translate(
+                    frame.left() + phase_x - step_draw,
+                    frame.top() + phase_y - step_draw,
+                )
+                p.drawPicture(0, 0, self._grid_pic)
+                p.restore()
 
         # Hover-linked grid highlight (draw-space rects relative to frames)
         if self.grid_on and self.hover_cell is not None:
@@ -24,6 +24,7 @@ class CanvasWidget(
     # Signals for external UI
     currentPathChanged = QtCore.pyqtSignal(object)  # Path or None
     cropProgress = QtCore.pyqtSignal(int, int)  # done, total
+    statusMessage = QtCore.pyqtSignal(str)  # transient status-bar text
     modeChanged = QtCore.pyqtSignal(bool)  # True if perspective
     activeCornerChanged = QtCore.pyqtSignal(int)  # 0..3
 
@@ -42,6 +43,9 @@ class CanvasWidget(
     def _emit_crop_progress(self, done: int, total: int) -> None:
         self.cropProgress.emit(done, total)
 
+    def _emit_status_message(self, msg: str) -> None:
+        self.statusMessage.emit(msg)
+
     def _on_mode_changed(self, is_persp: bool) -> None:
         self.modeChanged.emit(bool(is_persp))
 
@@ -50,6 +50,7 @@ class MainWindow(QtWidgets.QMainWindow):
             lambda _p: highlight_current_in_sidebar(self.sidebar, self.canvas)
         )
         self.canvas.cropProgress.connect(self._on_crop_progress)
+        self.canvas.statusMessage.connect(lambda m: self.status.showMessage(m, 5000))
 
         build_sidebar(self.sidebar, self.canvas)
         rebuild_watchers(self.watcher, self.canvas)
@@ -66,6 +66,7 @@ def sidebar_double_clicked(mw, item: QtWidgets.QTreeWidgetItem, _col: int) -> No
             if idx is not None:
                 mw.canvas.idx = idx
                 mw.canvas.update()
+                mw.canvas.prefetch_neighbours()
                 highlight_current_in_sidebar(mw.sidebar, mw.canvas)
     elif p.is_dir():
         mw.canvas.set_paths(base_path=None, src_dir=p, align_out=None, crop_out=None)
@@ -1,24 +1,187 @@
 from __future__ import annotations
 
+import hashlib
+import os
+import struct
 from pathlib import Path
+from typing import List, Optional, Set, Tuple
 import cv2
 import numpy as np
 
-SUPPORTED_LOWER = {".jpg", ".jpeg", ".png", ".jpe"}
+try:
+    from turbojpeg import TurboJPEG  # type: ignore
+except ImportError:
+    TurboJPEG = None
+
+try:
+    import pyvips  # type: ignore
+except (ImportError, OSError):  # OSError: binding present, libvips missing
+    pyvips = None
+
+SUPPORTED_LOWER = frozenset({".jpg", ".jpeg", ".png", ".jpe"})
+_JPEG_LOWER = frozenset({".jpg", ".jpeg", ".jpe"})
+_PNG_LOWER = frozenset({".png"})
+# libjpeg-turbo MCU size per chroma subsampling (TJSAMP_444 .. TJSAMP_411)
+_MCU_W = (8, 16, 16, 8, 8, 32)
+_MCU_H = (8, 8, 16, 8, 16, 8)
+_turbo = None
+
+# imwrite/imencode params for every PNG the app writes (aligned, crops). Kept
+# at OpenCV's defaults: on a 3000x2000 photo-like frame (OpenCV 5) they encode
+# in ~225 ms, vs ~430 ms for COMPRESSION=1 + STRATEGY_RLE and ~535 ms for
+# COMPRESSION=1 alone, at a comparable size. Tune here, not per call site.
+PNG_ENCODE_PARAMS: List[int] = []
+
+def list_images(root: Path) -> List[Path]:
+    """Supported image files under root (recursive), sorted case-insensitively.
+
+    Walks with os.scandir so directory entries are classified from the
+    readdir data; only accepted files become Path objects. Like Path.rglob,
+    symlinked directories are not descended into and unreadable ones are skipped.
+    """
+    found: List[str] = []
+    stack = [str(root)]
+    while stack:
+        try:
+            with os.scandir(stack.pop()) as it:
+                for entry in it:
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(entry.path)
+                    elif (
+                        os.path.splitext(entry.name)[1].lower() in SUPPORTED_LOWER
+                        and entry.is_file()
+                    ):
+                        found.append(entry.path)
+        except OSError:
+            continue
+    found.sort(key=str.lower)
+    return [Path(p) for p in found]
 
 def load_image_bgr(path: str) -> np.ndarray:
-    """Load BGR image with EXIF orientation correction when Pillow is present."""
+    """Load BGR image with EXIF orientation correction when Pillow is present.
+
+    Always returns a C-contiguous HxWx3 uint8 array so OpenCV never has to make
+    a hidden per-call copy of it.
+    """
     try:
         from PIL import Image, ImageOps
         im = Image.open(path)
         im = ImageOps.exif_transpose(im)
         rgb = np.array(im.convert("RGB"))
-        return cv2.cvtColor(rgb, cv2.COLOR_RGB2BGR)
+        img = cv2.cvtColor(rgb, cv2.COLOR_RGB2BGR)
     except Exception:
         img = cv2.imread(path, cv2.IMREAD_COLOR)
         if img is None:
             raise RuntimeError(f"Failed to read image: {path}")
-        return img
+    # both decoders yield 3-channel BGR; only the layout needs normalizing
+    return np.ascontiguousarray(img, dtype=np.uint8)
+
+def _jpeg_roi_bgr(path: str, x: int, y: int, w: int, h: int) -> Optional[np.ndarray]:
+    """Decode only the MCU-aligned blocks covering a JPEG region, or None.
+
+    Uses PyTurboJPEG's lossless crop when it is installed. Files with an EXIF
+    rotation are left to the full decode: the region is in upright pixels.
+    """
+    global _turbo
+    if TurboJPEG is None or os.path.splitext(path)[1].lower() not in _JPEG_LOWER:
+        return None
+    try:
+        from PIL import Image
+        with Image.open(path) as im:
+            if im.getexif().get(0x0112, 1) != 1:
+                return None
+        if _turbo is None:
+            _turbo = TurboJPEG()
+        with open(path, "rb") as f:
+            buf = f.read()
+        width, height, subsample, _ = _turbo.decode_header(buf)
+        # The crop origin must sit on an MCU boundary; round down and slice
+        # the remainder off after decoding.
+        x0 = x - x % _MCU_W[subsample]
+        y0 = y - y % _MCU_H[subsample]
+        x1, y1 = min(x + w, width), min(y + h, height)
+        if x0 >= x1 or y0 >= y1:
+            return None
+        block = _turbo.decode(_turbo.crop(buf, x0, y0, x1 - x0, y1 - y0))
+    except Exception:
+        return None
+    roi = block[y - y0 : y1 - y0, x - x0 : x1 - x0]
+    return np.ascontiguousarray(roi, dtype=np.uint8)
+
+def load_png_bgr_roi(path: str, x: int, y: int, w: int, h: int) -> Optional[np.ndarray]:
+    """Decode only the rows a PNG region needs, or None.
+
+    Uses pyvips when it is installed: libvips reads the file sequentially,
+    stops after the region's last row and never holds the full image.
+    Palette files are expanded to RGB(A) by libvips; alpha is dropped, as
+    load_image_bgr and cv2.IMREAD_COLOR do. Grey and 16-bit files and files
+    with an EXIF rotation are left to the full decode (None).
+    """
+    if pyvips is None or os.path.splitext(path)[1].lower() not in _PNG_LOWER:
+        return None
+    try:
+        im = pyvips.Image.new_from_file(path, access="sequential")
+        if im.get_typeof("orientation") and im.get("orientation") != 1:
+            return None
+        if im.format != "uchar" or im.bands not in (3, 4):
+            return None
+        x1, y1 = min(x + w, im.width), min(y + h, im.height)
+        if x >= x1 or y >= y1:
+            return None
+        region = im.crop(x, y, x1 - x, y1 - y).extract_band(0, n=3)
+        rgb = np.frombuffer(region.write_to_memory(), dtype=np.uint8)
+    except Exception:
+        return None
+    rgb = rgb.reshape(y1 - y, x1 - x, 3)
+    return cv2.cvtColor(rgb, cv2.COLOR_RGB2BGR)
+
+def load_image_bgr_roi(path: str, x: int, y: int, w: int, h: int) -> np.ndarray:
+    """load_image_bgr(path)[y:y+h, x:x+w], decoding as little as possible.
+
+    JPEGs are cropped before decompression when PyTurboJPEG is available and
+    PNGs are decoded only down to the region when pyvips is; anything else is
+    decoded in full and sliced.
+    """
+    roi = _jpeg_roi_bgr(path, x, y, w, h)
+    if roi is None:
+        roi = load_png_bgr_roi(path, x, y, w, h)
+    if roi is not None:
+        return roi
+    return load_image_bgr(path)[y : y + h, x : x + w]
+
+# cv2.imread flags decoding a JPEG at 1/r size in the DCT domain, largest r first
+_REDUCED_COLOR = (
+    (8, cv2.IMREAD_REDUCED_COLOR_8),
+    (4, cv2.IMREAD_REDUCED_COLOR_4),
+    (2, cv2.IMREAD_REDUCED_COLOR_2),
+)
+
+def load_image_bgr_scaled(path: str, scale: float) -> np.ndarray:
+    """load_image_bgr(path) resized by scale (INTER_AREA), decoding less.
+
+    For a JPEG downscaled by 2x or more, libjpeg first decodes at 1/2, 1/4
+    or 1/8 size (the largest factor not below the target) and only the
+    residual factor is resized. Other formats, and JPEGs with an EXIF
+    rotation, are decoded in full.
+    """
+    img = None
+    if os.path.splitext(path)[1].lower() in _JPEG_LOWER and scale <= 0.5:
+        try:
+            from PIL import Image
+            with Image.open(path) as im:
+                if im.getexif().get(0x0112, 1) == 1:
+                    width, height = im.size
+                    flag = next(f for r, f in _REDUCED_COLOR if r * scale <= 1.0)
+                    img = cv2.imread(path, flag)
+        except Exception:
+            img = None
+    if img is None:
+        img = load_image_bgr(path)
+        width, height = img.shape[1], img.shape[0]
+    size = (int(round(width * scale)), int(round(height * scale)))
+    if img.shape[1::-1] != size:
+        img = cv2.resize(img, size, interpolation=cv2.INTER_AREA)
+    return np.ascontiguousarray(img, dtype=np.uint8)
 
 def uniform_preview_scale(width: int, height: int, max_side: int) -> float:
     m = max(width, height)
@@ -27,9 +190,157 @@ def uniform_preview_scale(width: int, height: int, max_side: int) -> float:
 def clamp(v: float, lo: float, hi: float) -> float:
     return max(lo, min(hi, v))
 
+def ensure_buffer(buf: Optional[np.ndarray], shape: Tuple[int, ...]) -> np.ndarray:
+    """Return buf if it is a uint8 array of the given shape, else a new empty one."""
+    if buf is None or buf.shape != tuple(shape) or buf.dtype != np.uint8:
+        return np.empty(shape, dtype=np.uint8)
+    return buf
+
+_PNG_SIG = b"\x89PNG\r\n\x1a\n"
+# Chunks a plain-copied PNG may contain (IEND ends the walk)
+_PNG_PLAIN_CHUNKS = frozenset({b"PLTE", b"IDAT"})
+
+def is_plain_png(path: Path, width: int, height: int) -> bool:
+    """True if path is a width x height 8-bit RGB PNG with only critical chunks.
+
+    Such a file decodes to exactly the array load_image_bgr/cv2.imread give,
+    so writing that whole array back out can be a plain file copy. Any other
+    chunk (tRNS, iCCP, gAMA, text, eXIf, ...) would be carried over by a copy
+    but dropped by a re-encode, so those files are rejected. Only the chunk
+    headers are read; the data is skipped.
+    """
+    try:
+        with open(path, "rb") as f:
+            # signature + IHDR (length, type, 13 data bytes, CRC)
+            head = f.read(33)
+            if len(head) < 33 or head[:8] != _PNG_SIG or head[12:16] != b"IHDR":
+                return False
+            w, h, depth, color = struct.unpack(">IIBB", head[16:26])
+            if (w, h, depth, color) != (width, height, 8, 2):
+                return False
+            seen_idat = False
+            while True:
+                hdr = f.read(8)
+                if len(hdr) < 8:
+                    return False  # truncated: no IEND
+                length, kind = struct.unpack(">I4s", hdr)
+                if kind == b"IEND":
+                    return seen_idat
+                if kind not in _PNG_PLAIN_CHUNKS:
+                    return False
+                seen_idat |= kind == b"IDAT"
+                f.seek(length + 4, os.SEEK_CUR)
+    except OSError:
+        return False
+
+_made_dirs: Set[Path] = set()
+
+def ensure_dir(path: Path) -> None:
+    """mkdir -p path, remembering directories already made this session.
+
+    A remembered directory costs one stat (it may have been deleted since)
+    instead of mkdir's failing syscall, exception and follow-up stat.
+    """
+    if path in _made_dirs and path.is_dir():
+        return
+    path.mkdir(parents=True, exist_ok=True)
+    _made_dirs.add(path)
+
+# On-disk preview cache budget; least recently used entries are pruned first
+PREVIEW_CACHE_MAX_BYTES = 2 << 30
+
+def preview_cache_dir() -> Path:
+    """Per-user directory holding cached preview arrays.
+
+    <GenericCacheLocation>/MicroAlign/previews, e.g. ~/.cache/MicroAlign/previews
+    on Linux. It only holds regenerable .npy files, capped at
+    PREVIEW_CACHE_MAX_BYTES, and can be deleted at any time.
+    """
+    from PyQt5.QtCore import QStandardPaths
+    root = QStandardPaths.writableLocation(QStandardPaths.GenericCacheLocation)
+    base = Path(root) if root else Path.home() / ".cache"
+    return base / "MicroAlign" / "previews"
+
+def _preview_cache_file(cache_dir: Path, path: Path, scale: float) -> Path:
+    st = path.stat()
+    key = f"{path.resolve()}|{st.st_mtime_ns}|{st.st_size}|{scale!r}"
+    return cache_dir / (hashlib.blake2b(key.encode(), digest_size=12).hexdigest() + ".npy")
+
+def load_cached_preview(cache_dir: Path, path: Path, scale: float) -> Optional[np.ndarray]:
+    """Return the cached preview of path at scale, or None on a miss.
+
+    Entries are keyed by path, mtime, size and scale, so an edited source or a
+    different base (preview scale) never hits a stale array.
+    """
+    try:
+        entry = _preview_cache_file(cache_dir, path, scale)
+        prev = np.load(entry, allow_pickle=False)
+        # Recency for pruning is the mtime: atime is often not maintained
+        os.utime(entry)
+    except (OSError, ValueError):
+        return None
+    if prev.ndim != 3 or prev.shape[2] != 3 or prev.dtype != np.uint8:
+        return None
+    return np.ascontiguousarray(prev)
+
+def store_cached_preview(cache_dir: Path, path: Path, scale: float, prev: np.ndarray) -> None:
+    """Best-effort write of a preview array; failures only cost a future miss.
+
+    The cache is pruned back under PREVIEW_CACHE_MAX_BYTES after each write.
+    """
+    try:
+        target = _preview_cache_file(cache_dir, path, scale)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        tmp = target.with_name(f"{target.stem}.{os.getpid()}.tmp.npy")
+        np.save(tmp, prev, allow_pickle=False)
+        os.replace(tmp, target)
+    except OSError:
+        return
+    prune_preview_cache(cache_dir, PREVIEW_CACHE_MAX_BYTES)
+
+def prune_preview_cache(
+    cache_dir: Path, max_bytes: int = PREVIEW_CACHE_MAX_BYTES
+) -> None:
+    """Delete the least recently used previews until the cache fits max_bytes.
+
+    Recency is the file mtime, refreshed on every hit. Entries that vanish or
+    cannot be removed (another process pruning, permissions) are skipped.
+    """
+    entries = []
+    total = 0
+    try:
+        with os.scandir(cache_dir) as it:
+            for entry in it:
+                if entry.name.endswith(".npy") and entry.is_file():
+                    st = entry.stat()
+                    entries.append((st.st_mtime_ns, st.st_size, entry.path))
+                    total += st.st_size
+    except OSError:
+        return
+    if total <= max_bytes:
+        return
+    entries.sort()
+    for _, size, entry_path in entries:
+        try:
+            os.remove(entry_path)
+        except OSError:
+            continue
+        total -= size
+        if total <= max_bytes:
+            break
+
 def bgr_to_qimage(img_bgr: np.ndarray):
-    """Return QImage from BGR ndarray, copying to own buffer."""
+    """Return QImage from BGR ndarray, copying to own buffer.
+
+    The image is Format_RGB32 (BGRA bytes on little-endian hosts), written in
+    one cvtColor pass straight into the QImage's own buffer. That is the raster
+    pixmap format, so QPixmap.fromImage needs no further conversion.
+    """
     from PyQt5.QtGui import QImage
-    rgb = cv2.cvtColor(img_bgr, cv2.COLOR_BGR2RGB)
-    h, w, ch = rgb.shape
-    return QImage(rgb.data, w, h, ch * w, QImage.Format.Format_RGB888).copy()
+    h, w = img_bgr.shape[:2]
+    qimg = QImage(w, h, QImage.Format.Format_RGB32)
+    ptr = qimg.bits()
+    ptr.setsize(qimg.sizeInBytes())
+    bgra = np.frombuffer(ptr, np.uint8).reshape(h, qimg.bytesPerLine() // 4, 4)
+    cv2.cvtColor(img_bgr, cv2.COLOR_BGR2BGRA, dst=bgra)
+    return qimg
@@ -0,0 +1,52 @@
+import os
+
+# QImage/QWidget code under test must not need a display
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+import cv2  # noqa: E402
+import numpy as np  # noqa: E402
+import pytest  # noqa: E402
+
+
+@pytest.fixture(scope="session")
+def qapp():
+    from PyQt5 import QtWidgets
+
+    return QtWidgets.QApplication.instance() or QtWidgets.QApplication([])
+
+
+@pytest.fixture
+def make_canvas(qapp, tmp_path):
+    """Build an AlignCanvas on a small project of n source images."""
+    from PyQt5 import QtGui
+
+    from align_app.ui.align_canvas import AlignCanvas
+
+    made = []
+
+    def make(n=4):
+        rng = np.random.default_rng(0)
+        base = rng.integers(0, 255, (90, 120, 3), np.uint8)
+        cv2.imwrite(str(tmp_path / "base.png"), base)
+        src = tmp_path / "src"
+        src.mkdir()
+        for i in range(n):
+            cv2.imwrite(str(src / f"img{i}.png"), np.roll(base, i, axis=1))
+        canvas = AlignCanvas()
+        canvas.preview_cache_dir = None  # keep tests off the user's cache
+        canvas.resize(600, 300)
+        made.append(canvas)
+        canvas.set_paths(
+            tmp_path / "base.png", src, tmp_path / "aligned", tmp_path / "crops"
+        )
+        canvas._prefetch_pool.waitForDone()
+        # panel rects are laid out on paint
+        canvas.render(QtGui.QImage(canvas.size(), QtGui.QImage.Format_RGB32))
+        return canvas
+
+    yield make
+    for canvas in made:
+        canvas._prefetch_pool.waitForDone()
+        canvas.stop_compose_thread()
+        canvas.deleteLater()
+    qapp.processEvents()
@@ -0,0 +1,148 @@
+"""CanvasWidget behaviour driven through its event handlers."""
+
+import cv2
+import pytest
+from PyQt5 import QtCore, QtGui, QtWidgets
+
+
+def _mouse(canvas, kind, pos, button=QtCore.Qt.LeftButton):
+    etype = {
+        "press": QtCore.QEvent.MouseButtonPress,
+        "move": QtCore.QEvent.MouseMove,
+        "release": QtCore.QEvent.MouseButtonRelease,
+    }[kind]
+    buttons = QtCore.Qt.NoButton if kind == "release" else button
+    ev = QtGui.QMouseEvent(
+        etype, QtCore.QPointF(pos), button, buttons, QtCore.Qt.NoModifier
+    )
+    QtWidgets.QApplication.sendEvent(canvas, ev)
+
+
+def test_view_pan_keeps_full_quality_warp(make_canvas):
+    canvas = make_canvas()
+    canvas.set_pan_mode(True)
+    pos = canvas.right_rect.center()
+
+    _mouse(canvas, "press", pos)
+    assert canvas._view_panning
+    # a view pan only moves the composed panel; the warp is not redone
+    assert canvas._live_flags == cv2.INTER_LINEAR
+    _mouse(canvas, "move", pos + QtCore.QPoint(10, 5))
+    _mouse(canvas, "release", pos + QtCore.QPoint(10, 5))
+    assert canvas._live_flags == cv2.INTER_LINEAR
+
+
+def test_affine_drag_uses_nearest_until_release(make_canvas):
+    canvas = make_canvas()
+    pos = canvas.right_rect.center()
+
+    _mouse(canvas, "press", pos)
+    assert canvas.dragging
+    assert canvas._live_flags == cv2.INTER_NEAREST
+    _mouse(canvas, "release", pos)
+    assert canvas._live_flags == cv2.INTER_LINEAR
+
+
+def _crop_all(canvas, monkeypatch, cancel):
+    progress, status = [], []
+    monkeypatch.setattr(canvas, "_emit_crop_progress", lambda *a: progress.append(a))
+    monkeypatch.setattr(canvas, "_emit_status_message", status.append)
+    monkeypatch.setattr(
+        QtWidgets.QProgressDialog, "wasCanceled", lambda self: cancel
+    )
+    canvas.crop_from_aligned = False
+    canvas.crop_rect_px = QtCore.QRect(
+        canvas.left_rect.x() + 5, canvas.left_rect.y() + 5, 40, 30
+    )
+    canvas._confirm_crop_all()
+    return progress, status
+
+
+def test_crop_all_reports_completion(make_canvas, monkeypatch):
+    canvas = make_canvas(4)
+    progress, status = _crop_all(canvas, monkeypatch, cancel=False)
+    assert progress[-1] == (4, 4)
+    assert status[-1].startswith("Cropped 4 source images")
+
+
+def test_crop_all_cancel_reports_partial_progress(make_canvas, monkeypatch):
+    canvas = make_canvas(4)
+    progress, status = _crop_all(canvas, monkeypatch, cancel=True)
+    done = progress[-2][0]
+    assert 0 < done < 4
+    assert progress[-2:] == [(done, 4), (0, 0)]  # partial count, then cleared
+    assert (4, 4) not in progress
+    assert status[-1].startswith(f"Cropping cancelled after {done} of 4")
+
+
+def _key(canvas, kind, key, autorepeat=False):
+    etype = QtCore.QEvent.KeyPress if kind == "press" else QtCore.QEvent.KeyRelease
+    ev = QtGui.QKeyEvent(etype, key, QtCore.Qt.NoModifier, "", autorepeat)
+    QtWidgets.QApplication.sendEvent(canvas, ev)
+
+
+def _hold_key(canvas, key, repeats):
+    """Press, auto-repeat (release/press pairs, as Qt sends them), release."""
+    _key(canvas, "press", key)
+    for _ in range(repeats):
+        _key(canvas, "release", key, autorepeat=True)
+        _key(canvas, "press", key, autorepeat=True)
+    _key(canvas, "release", key)
+
+
+def _tx(canvas):
+    return canvas.params[canvas.current_path()].tx
+
+
+def _undo_steps(canvas):
+    steps = 0
+    while canvas._hist_idx.get(canvas.current_path(), 0):
+        canvas.undo()
+        steps += 1
+    return steps
+
+
+def test_held_key_undoes_as_one_step(make_canvas):
+    canvas = make_canvas()
+    _hold_key(canvas, QtCore.Qt.Key_Right, repeats=5)
+    assert _tx(canvas) == pytest.approx(6 * canvas.step)
+
+    canvas.undo()
+    assert _tx(canvas) == 0.0
+    assert _undo_steps(canvas) == 0
+
+
+def test_drag_undoes_as_one_step(make_canvas):
+    canvas = make_canvas()
+    pos = canvas.right_rect.center()
+    _mouse(canvas, "press", pos)
+    for i in range(1, 6):
+        _mouse(canvas, "move", pos + QtCore.QPoint(4 * i, i))
+    _mouse(canvas, "release", pos + QtCore.QPoint(20, 5))
+    assert _tx(canvas) > 0
+
+    canvas.undo()
+    assert _tx(canvas) == 0.0
+    assert _undo_steps(canvas) == 0
+
+
+def test_separate_gestures_undo_separately(make_canvas):
+    canvas = make_canvas()
+    # back to back, well inside the time-based coalescing window
+    _hold_key(canvas, QtCore.Qt.Key_Right, repeats=2)
+    _hold_key(canvas, QtCore.Qt.Key_Right, repeats=1)
+    assert _tx(canvas) == pytest.approx(5 * canvas.step)
+    pos = canvas.right_rect.center()
+    _mouse(canvas, "press", pos)
+    _mouse(canvas, "move", pos + QtCore.QPoint(8, 0))
+    _mouse(canvas, "release", pos + QtCore.QPoint(8, 0))
+    after_drag = _tx(canvas)
+
+    canvas.undo()  # the drag
+    assert _tx(canvas) == pytest.approx(5 * canvas.step)
+    canvas.undo()  # the second key hold
+    assert _tx(canvas) == pytest.approx(3 * canvas.step)
+    canvas.redo()
+    canvas.redo()
+    assert _tx(canvas) == after_drag
+    assert _undo_steps(canvas) == 3
@@ -0,0 +1,94 @@
+"""PanelComposer: the fused display-scale warp matches warp-then-resize."""
+
+import cv2
+import numpy as np
+import pytest
+
+from align_app.ui import canvas_compose
+from align_app.ui.canvas_compose import ComposeJob, PanelComposer
+
+PW, PH = 800, 600
+SIZE = (560, 420)  # 0.7x: bilinear display filter, fused path
+QUAD = [(40.0, 30.0), (770.0, 60.0), (740.0, 580.0), (20.0, 540.0)]
+
+
+def _smooth(seed):
+    rng = np.random.default_rng(seed)
+    img = rng.integers(0, 255, (PH // 8, PW // 8, 3), np.uint8)
+    return cv2.resize(img, (PW, PH), interpolation=cv2.INTER_CUBIC)
+
+
+def _pixels(qimg):
+    ptr = qimg.constBits()
+    ptr.setsize(qimg.sizeInBytes())
+    arr = np.frombuffer(ptr, np.uint8).reshape(qimg.height(), -1, 4)
+    return arr[:, : qimg.width(), :3].copy()
+
+
+def _render(size, dest_quad, use_opencl=False):
+    m_small = cv2.getRotationMatrix2D((PW / 2, PH / 2), 4.0, 0.93)
+    m_small[0, 2] += 7.3
+    job = ComposeJob(
+        key=(size,),
+        warp_key=("p",),
+        base_prev=_smooth(0),
+        mov_prev=_smooth(1),
+        m_small=m_small,
+        dest_quad=dest_quad,
+        overlay=False,
+        alpha=0.5,
+        outline=False,
+        flags=cv2.INTER_LINEAR,
+        size=size,
+        resize_flags=cv2.INTER_LINEAR,
+        use_opencl=use_opencl,
+    )
+    return _pixels(PanelComposer().render(job))
+
+
+def _reference(dest_quad):
+    full = _render((PW, PH), dest_quad)
+    return cv2.resize(full, SIZE, interpolation=cv2.INTER_LINEAR)
+
+
+@pytest.mark.parametrize("dest_quad", [None, QUAD], ids=["affine", "perspective"])
+@pytest.mark.parametrize("use_opencl", [False, True], ids=["cpu", "umat"])
+def test_fused_matches_warp_then_resize(dest_quad, use_opencl, monkeypatch):
+    if use_opencl:
+        # Without a device UMat runs on the CPU, through the same code path
+        monkeypatch.setattr(canvas_compose, "opencl_available", lambda: True)
+    fused = _render(SIZE, dest_quad, use_opencl)
+    ref = _reference(dest_quad)
+    assert fused.shape == ref.shape
+    diff = np.abs(fused.astype(np.int16) - ref.astype(np.int16))
+    assert diff.mean() < 2.0
+    coverage = (fused.any(axis=2) != ref.any(axis=2)).mean()
+    assert coverage < 0.01
+
+
+def test_overlay_kernel_matches_numpy(monkeypatch):
+    pytest.importorskip("numba")
+    from align_app.ui import _compose_numba, canvas_affine
+
+    base = _smooth(2)[:300, :400].copy()  # under the kernel's size cutoff
+    base.flags.writeable = False
+    warped = _smooth(3)[:300, :400].copy()
+    warped[:100] = 0  # uncovered rows keep the base
+    monkeypatch.setattr(_compose_numba, "overlay_kernel", None)
+    ref = canvas_affine._overlay(base, warped, 0.3)
+    monkeypatch.undo()
+    _compose_numba.warm_up()
+    assert _compose_numba.overlay_kernel is not None
+    calls = []
+    kernel = _compose_numba.overlay_kernel
+    monkeypatch.setattr(
+        _compose_numba, "overlay_kernel", lambda *a: calls.append(kernel(*a))
+    )
+    got = canvas_affine._overlay(base, warped, 0.3)
+    assert calls
+    assert np.abs(got.astype(int) - ref).max() <= 1
+    np.testing.assert_array_equal(got[:100], base[:100])
+    # a layout warm_up did not compile falls back rather than JIT-ing
+    wide = np.zeros((4, 4, 3), np.float32)
+    out = canvas_affine._overlay(wide, wide, 0.3)
+    assert out.shape == wide.shape
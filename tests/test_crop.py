@@ -0,0 +1,58 @@
+"""CanvasCropMixin helpers that need no widget."""
+
+import os
+import time
+from types import SimpleNamespace
+
+from align_app.ui.canvas_crop_impl import CanvasCropMixin
+
+
+def _listing(align_out):
+    canvas = SimpleNamespace(align_out=align_out, _align_listing_cache=None)
+    return canvas, CanvasCropMixin._aligned_files(canvas)
+
+
+def test_aligned_files_case_insensitive_and_sorted(tmp_path):
+    for name in ["b.png", "A.PNG", "c.Png", ".hidden.png", "d.jpg", "a0.png"]:
+        (tmp_path / name).write_bytes(b"")
+    (tmp_path / "sub.png").mkdir()
+
+    _, files = _listing(tmp_path)
+
+    assert [f.name for f in files] == ["A.PNG", "a0.png", "b.png", "c.Png"]
+
+
+def _set_mtime(path, mtime_ns):
+    os.utime(path, ns=(path.stat().st_atime_ns, mtime_ns))
+
+
+def test_aligned_files_relisted_when_folder_changes(tmp_path):
+    (tmp_path / "a.png").write_bytes(b"")
+    settled = time.time_ns() - 10_000_000_000
+    _set_mtime(tmp_path, settled)
+    canvas, files = _listing(tmp_path)
+    assert CanvasCropMixin._aligned_files(canvas) is files  # memoized
+
+    (tmp_path / "b.png").write_bytes(b"")
+    _set_mtime(tmp_path, settled + 1_000_000)
+
+    assert [f.name for f in CanvasCropMixin._aligned_files(canvas)] == [
+        "a.png",
+        "b.png",
+    ]
+
+
+def test_aligned_files_not_memoized_while_mtime_is_fresh(tmp_path):
+    # On a coarse-mtime filesystem a write in the same tick keeps the mtime
+    (tmp_path / "a.png").write_bytes(b"")
+    fresh = tmp_path.stat().st_mtime_ns
+    canvas, _ = _listing(tmp_path)
+    assert canvas._align_listing_cache is None
+
+    (tmp_path / "b.png").write_bytes(b"")
+    _set_mtime(tmp_path, fresh)
+
+    assert [f.name for f in CanvasCropMixin._aligned_files(canvas)] == [
+        "a.png",
+        "b.png",
+    ]
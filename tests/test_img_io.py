@@ -0,0 +1,124 @@
+"""img_io helpers: on-disk preview cache and region decoding."""
+
+import os
+
+import cv2
+import numpy as np
+import pytest
+
+from align_app.utils import img_io
+
+
+def _sources(tmp_path, n):
+    srcs = []
+    for i in range(n):
+        src = tmp_path / f"img{i}.png"
+        src.write_bytes(b"x")
+        srcs.append(src)
+    return srcs
+
+
+def _prev(value):
+    return np.full((64, 64, 3), value, np.uint8)
+
+
+def test_preview_cache_store_prunes_least_recently_used(tmp_path, monkeypatch):
+    cache = tmp_path / "cache"
+    srcs = _sources(tmp_path, 3)
+    img_io.store_cached_preview(cache, srcs[0], 0.5, _prev(0))
+    img_io.store_cached_preview(cache, srcs[1], 0.5, _prev(1))
+    entry_size = next(cache.iterdir()).stat().st_size
+    monkeypatch.setattr(img_io, "PREVIEW_CACHE_MAX_BYTES", 2 * entry_size)
+
+    # Both entries old; a hit makes entry 0 the most recently used
+    for f in cache.iterdir():
+        os.utime(f, ns=(1, 1))
+    assert img_io.load_cached_preview(cache, srcs[0], 0.5)[0, 0, 0] == 0
+
+    img_io.store_cached_preview(cache, srcs[2], 0.5, _prev(2))
+
+    assert len(list(cache.iterdir())) == 2
+    assert img_io.load_cached_preview(cache, srcs[0], 0.5) is not None
+    assert img_io.load_cached_preview(cache, srcs[1], 0.5) is None
+    assert img_io.load_cached_preview(cache, srcs[2], 0.5) is not None
+
+
+def test_prune_preview_cache_under_budget_keeps_everything(tmp_path):
+    cache = tmp_path / "cache"
+    for i, src in enumerate(_sources(tmp_path, 3)):
+        img_io.store_cached_preview(cache, src, 0.5, _prev(i))
+    img_io.prune_preview_cache(cache, 1 << 20)
+    assert len(list(cache.iterdir())) == 3
+    img_io.prune_preview_cache(cache, 0)
+    assert list(cache.iterdir()) == []
+
+
+ROI = (13, 7, 40, 30)  # x, y, w, h
+
+
+def _png_variants(tmp_path):
+    """RGB, RGBA and palette PNGs of the same picture."""
+    from PIL import Image
+
+    rng = np.random.default_rng(0)
+    rgb = rng.integers(0, 255, (60, 80, 3), np.uint8)
+    alpha = rng.integers(0, 255, (60, 80, 1), np.uint8)
+    paths = {
+        "rgb": tmp_path / "rgb.png",
+        "rgba": tmp_path / "rgba.png",
+        "palette": tmp_path / "palette.png",
+    }
+    Image.fromarray(rgb).save(paths["rgb"])
+    Image.fromarray(np.concatenate([rgb, alpha], axis=2)).save(paths["rgba"])
+    Image.fromarray(rgb).quantize(64).save(paths["palette"])
+    return paths
+
+
+def _expected(path):
+    x, y, w, h = ROI
+    return img_io.load_image_bgr(str(path))[y : y + h, x : x + w]
+
+
+def test_load_png_bgr_roi_matches_full_decode(tmp_path):
+    pytest.importorskip("pyvips")
+    if img_io.pyvips is None:
+        pytest.skip("libvips not loadable")
+    for kind, path in _png_variants(tmp_path).items():
+        roi = img_io.load_png_bgr_roi(str(path), *ROI)
+        assert roi is not None, kind
+        np.testing.assert_array_equal(roi, _expected(path), err_msg=kind)
+
+
+def test_load_image_bgr_roi_without_pyvips(tmp_path, monkeypatch):
+    monkeypatch.setattr(img_io, "pyvips", None)
+    for kind, path in _png_variants(tmp_path).items():
+        assert img_io.load_png_bgr_roi(str(path), *ROI) is None
+        roi = img_io.load_image_bgr_roi(str(path), *ROI)
+        np.testing.assert_array_equal(roi, _expected(path), err_msg=kind)
+
+
+def test_is_plain_png_rejects_ancillary_chunks(tmp_path):
+    from PIL import Image, PngImagePlugin
+
+    rgb = np.random.default_rng(1).integers(0, 255, (60, 80, 3), np.uint8)
+    plain = tmp_path / "plain.png"
+    cv2.imwrite(str(plain), rgb)
+    assert img_io.is_plain_png(plain, 80, 60)
+    assert not img_io.is_plain_png(plain, 60, 80)
+
+    info = PngImagePlugin.PngInfo()
+    info.add_text("Comment", "x")
+    variants = {
+        "text": {"pnginfo": info},
+        "trns": {"transparency": (0, 0, 0)},
+        "iccp": {"icc_profile": b"\0" * 128},
+    }
+    for kind, kwargs in variants.items():
+        path = tmp_path / f"{kind}.png"
+        Image.fromarray(rgb).save(path, **kwargs)
+        assert not img_io.is_plain_png(path, 80, 60), kind
+
+    # a truncated file never reaches IEND
+    trunc = tmp_path / "trunc.png"
+    trunc.write_bytes(plain.read_bytes()[:-12])
+    assert not img_io.is_plain_png(trunc, 80, 60)
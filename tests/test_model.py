@@ -0,0 +1,196 @@
+"""CanvasModelMixin state: aligned-image cache, undo history, prefetch."""
+
+import os
+
+import numpy as np
+
+
+def _frame(value, shape=(20, 30, 3)):
+    return np.full(shape, value, np.uint8)
+
+
+def _bump_mtime(path):
+    st = path.stat()
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+
+
+def test_cached_aligned_invalidated_when_file_changes(make_canvas, tmp_path):
+    canvas = make_canvas()
+    out = tmp_path / "a.png"
+    out.write_bytes(b"png")
+    img = _frame(1)
+    canvas._remember_aligned(out, img)
+    assert canvas.cached_aligned(out) is img
+
+    _bump_mtime(out)  # rewritten by someone else since it was saved
+    assert canvas.cached_aligned(out) is None
+    out.unlink()
+    assert canvas.cached_aligned(out) is None
+
+
+def test_aligned_cache_evicts_oldest_under_cap(make_canvas, tmp_path):
+    canvas = make_canvas()
+    frame_bytes = _frame(0).nbytes
+    canvas.aligned_cache_max_bytes = 2 * frame_bytes + 1
+    paths = []
+    for i in range(4):
+        out = tmp_path / f"{i}.png"
+        out.write_bytes(b"png")
+        paths.append(out)
+        canvas._remember_aligned(out, _frame(i))
+        assert canvas._aligned_cache_bytes <= canvas.aligned_cache_max_bytes
+
+    assert [canvas.cached_aligned(p) is not None for p in paths] == [
+        False,
+        False,
+        True,
+        True,
+    ]
+    assert canvas._aligned_cache_bytes == 2 * frame_bytes
+    # a frame larger than the whole cap is not kept at all
+    big = tmp_path / "big.png"
+    big.write_bytes(b"png")
+    canvas._remember_aligned(big, _frame(9, (60, 30, 3)))
+    assert canvas.cached_aligned(big) is None
+    assert canvas._aligned_cache_bytes == 2 * frame_bytes
+
+
+def test_aligned_cache_default_is_a_few_frames(make_canvas):
+    canvas = make_canvas()
+    assert canvas.aligned_cache_max_bytes <= 256 << 20
+
+
+def _state(canvas):
+    p = canvas.params[canvas.current_path()]
+    persp = list(p.persp) if p.persp is not None else None
+    return (p.tx, p.ty, p.theta, p.scale, persp)
+
+
+def _undo_redo_all(canvas, states, at_start=True):
+    """Undo back to states[0] and redo to states[-1], checking every step."""
+    for state in reversed(states[:-1]):
+        canvas.undo()
+        assert _state(canvas) == state
+    if at_start:
+        canvas.undo()  # nothing left: no-op
+        assert _state(canvas) == states[0]
+    for state in states[1:]:
+        canvas.redo()
+        assert _state(canvas) == state
+    canvas.redo()
+    assert _state(canvas) == states[-1]
+
+
+def test_undo_redo_restores_params_exactly(make_canvas, monkeypatch):
+    from align_app.ui import canvas_model
+
+    monkeypatch.setattr(canvas_model, "_HIST_COALESCE_S", 0.0)  # one step each
+    canvas = make_canvas()
+    states = [_state(canvas)]
+    for edit in (
+        lambda: canvas.move_dxdy(3.5, -1.25),
+        lambda: canvas.rotate_deg(0.7),
+        lambda: canvas.zoom_factor(1.05),
+        lambda: canvas.move_dxdy(-0.5, 2.0),
+    ):
+        edit()
+        states.append(_state(canvas))
+    _undo_redo_all(canvas, states)
+
+
+def test_undo_redo_perspective_corners(make_canvas, monkeypatch):
+    from align_app.ui import canvas_model
+
+    monkeypatch.setattr(canvas_model, "_HIST_COALESCE_S", 0.0)
+    canvas = make_canvas()
+    canvas.move_dxdy(2.0, 0.0)
+    states = [_state(canvas)]
+    assert states[0][4] is None  # no quad yet
+    for corner, (dx, dy) in [(0, (1.5, 0)), (2, (0, -2.25)), (0, (0.5, 0.5))]:
+        canvas.set_active_corner(corner)
+        canvas.nudge_corner(dx, dy)
+        states.append(_state(canvas))
+    _undo_redo_all(canvas, states, at_start=False)
+
+
+def test_reset_current_is_one_undoable_step(make_canvas, monkeypatch):
+    from align_app.ui import canvas_model
+
+    monkeypatch.setattr(canvas_model, "_HIST_COALESCE_S", 0.0)
+    canvas = make_canvas()
+    canvas.move_dxdy(4.0, 1.0)
+    canvas.rotate_deg(-1.5)
+    canvas.nudge_corner(3.0, 2.0)
+    before = _state(canvas)
+    canvas.reset_current()
+    assert _state(canvas) == (0.0, 0.0, 0.0, 1.0, None)
+    canvas.undo()
+    assert _state(canvas) == before
+    canvas.redo()
+    assert _state(canvas) == (0.0, 0.0, 0.0, 1.0, None)
+
+
+def test_history_is_per_image_and_new_edit_drops_redo(make_canvas, monkeypatch):
+    from align_app.ui import canvas_model
+
+    monkeypatch.setattr(canvas_model, "_HIST_COALESCE_S", 0.0)
+    canvas = make_canvas()
+    canvas.move_dxdy(1.0, 0.0)
+    canvas.move_dxdy(1.0, 0.0)
+    canvas.undo()
+    canvas.rotate_deg(2.0)  # replaces the undone move
+    canvas.redo()
+    assert _state(canvas)[:3] == (1.0, 0.0, 2.0)
+
+    canvas.idx = 1
+    canvas.undo()  # nothing recorded for this image
+    assert _state(canvas)[:3] == (0.0, 0.0, 0.0)
+    canvas.idx = 0
+    canvas.undo()
+    assert _state(canvas)[:3] == (1.0, 0.0, 0.0)
+
+
+class _RecordingPool:
+    """Stands in for the prefetch QThreadPool; records what gets queued."""
+
+    def __init__(self):
+        self.paths = []
+
+    def start(self, task):
+        self.paths.append(task._path)
+
+    def waitForDone(self):
+        return True
+
+
+def _queued(canvas, idx, radius=2):
+    pool = _RecordingPool()
+    canvas._prefetch_pool = pool
+    with canvas._cache_lock:
+        canvas.cache_prev.clear()
+        canvas._prefetching.clear()
+    canvas.idx = idx
+    canvas.prefetch_neighbours(radius)
+    return [canvas.files.index(p) for p in pool.paths]
+
+
+def test_prefetch_order_is_nearest_first_without_current(make_canvas):
+    canvas = make_canvas(8)
+    assert _queued(canvas, 4, radius=3) == [5, 3, 6, 2, 7, 1]
+    # clipped at both ends of the list, never the shown image
+    assert _queued(canvas, 0) == [1, 2]
+    assert _queued(canvas, 7) == [6, 5]
+
+
+def test_prefetch_skips_cached_and_in_flight(make_canvas):
+    canvas = make_canvas(8)
+    pool = _RecordingPool()
+    canvas._prefetch_pool = pool
+    canvas.idx = 4
+    with canvas._cache_lock:
+        canvas.cache_prev.clear()
+        canvas._prefetching.clear()
+        canvas.cache_prev[canvas.files[5]] = np.zeros((1, 1, 3), np.uint8)
+        canvas._prefetching.add(canvas.files[3])
+    canvas.prefetch_neighbours()
+    assert [canvas.files.index(p) for p in pool.paths] == [6, 2]